@@ -0,0 +1,32 @@
+"""
+conservative_update.py
+
+Throughput of ConservativeCountMinSketch.add_many against item-by-item `add`, from narrow sketches
+(where most keys collide) to wide ones. Run from the repository root with:
+    python -m benchmarks.conservative_update
+"""
+import time
+import numpy as np
+from summarization_algorithms.conservative_count_min_sketch import ConservativeCountMinSketch
+
+ITEMS = 20000
+BATCH_SIZE = 2000
+
+
+def throughput(add, items):
+    start = time.perf_counter()
+    add(items)
+    return len(items) / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    items = np.random.default_rng(0).zipf(1.3, ITEMS).tolist()
+    for width in (10, 100, 1000, 10000):
+        sequential = ConservativeCountMinSketch(width, 5, hash_family="multiply_shift")
+        batched = ConservativeCountMinSketch(width, 5, hash_family="multiply_shift")
+        sequential_rate = throughput(lambda stream: [sequential.add(item) for item in stream], items)
+        batched_rate = throughput(lambda stream: [batched.add_many(stream[start:start + BATCH_SIZE])
+                                                  for start in range(0, len(stream), BATCH_SIZE)], items)
+        assert (sequential.counters == batched.counters).all()
+        print(f"width {width:>5}: add {sequential_rate / 1e3:8.1f}k items/s, "
+              f"add_many {batched_rate / 1e3:8.1f}k items/s")
@@ -0,0 +1,48 @@
+"""
+sharding_throughput.py
+
+Ingestion throughput of the sharded mode of the simulation (`--workers`), worker startup included,
+against a single process, for several worker counts and merge intervals. Run from the repository
+root with:
+    python -m benchmarks.sharding_throughput
+"""
+import time
+import numpy as np
+from simulation.simulation import get_algorithm, simulate_sharded
+
+ITEMS = 2_000_000
+EVAL_INTERVAL = 2000
+WIDTH, DEPTH = 10000, 5
+
+
+class NoEvaluator:
+    def submit(self, cms, items, final=False):
+        pass
+
+
+def sketch():
+    return get_algorithm("CountMinSketch", WIDTH, DEPTH, "multiply_shift")
+
+
+if __name__ == '__main__':
+    items = np.random.default_rng(0).zipf(1.3, ITEMS).astype(np.int64)
+    batches = [items[start:start + EVAL_INTERVAL] for start in range(0, len(items), EVAL_INTERVAL)]
+
+    single = sketch()
+    start = time.perf_counter()
+    for batch in batches:
+        single.add_many(batch)
+    single_rate = ITEMS / (time.perf_counter() - start)
+    print(f"single process: {single_rate / 1e6:.2f}M items/s")
+
+    for workers in (2, 4):
+        for merge_interval in (EVAL_INTERVAL, 20000, 100000):
+            config = {"eval_interval": EVAL_INTERVAL, "merge_interval": merge_interval,
+                      "hash_family": "multiply_shift"}
+            sharded = sketch()
+            start = time.perf_counter()
+            simulate_sharded(sharded, iter(batches), NoEvaluator(), workers, "CountMinSketch", config)
+            rate = ITEMS / (time.perf_counter() - start)
+            assert (sharded.counters == single.counters).all()
+            print(f"{workers} workers, merge every {merge_interval:>6} items: {rate / 1e6:.2f}M items/s "
+                  f"({rate / single_rate:.0%} of single process)")
@@ -1,17 +1,34 @@
 import os
-import dash
 import json
+import dash
 import datetime
 import subprocess
 from dash import dcc, html
 import plotly.graph_objects as go
-from dash.dependencies import Input, Output, State
-import time
+from dash.dependencies import Input, Output, State, ALL
+from persistence.results_log import ResultsReader
+from visualization.downsampling import DEFAULT_MAX_POINTS, DownsampleCache, bucket_width, minmax_buckets
 
 
 app = dash.Dash(__name__)
 server = app.server
 
+
+def load_max_points(config_path="../config.json"):
+    """
+    Point budget of every trace, from the `max_points_per_trace` setting of the simulation config.
+    """
+    try:
+        with open(config_path, "r") as f:
+            return json.load(f).get("max_points_per_trace", DEFAULT_MAX_POINTS)
+    except (OSError, ValueError):
+        return DEFAULT_MAX_POINTS
+
+
+MAX_POINTS = load_max_points()
+RUN_READERS = {}  # results log path -> ResultsReader, so every tick parses only the appended records
+DOWNSAMPLED = DownsampleCache()  # downsampled traces by (results log, trace), recomputed only when the run grew
+
 GRAPH_METRICS = [
     ("avg_error_graph", "avg_error", "Average Error", "Avg Error vs. Processed Items"),
     ("avg_error_percentage_graph", "avg_error_percentage", "Average Error Percentage", "Avg Error Percentage vs. Processed Items"),
@@ -21,6 +38,7 @@ GRAPH_METRICS = [
     ("load_factor_graph", "load_factor", "Load Factor", "Load Factor vs. Processed Items"),
     ("avg_query_time_graph", "avg_query_time", "Average Query Time (seconds)", "Avg Query Time vs. Processed Items"),
     ("memory_usage_graph", "memory_usage", "Memory Usage (bytes)", "Memory Usage vs. Processed Items"),
+    ("snapshot_time_graph", "snapshot_time", "Snapshot Time (seconds)", "Snapshot Time vs. Processed Items"),
 ]
 
 PERCENTILE_GRAPHS = [
@@ -29,11 +47,16 @@ PERCENTILE_GRAPHS = [
     ("combined_percentiles_graph", "combined"),
 ]
 
+PERCENTILES = ["100th", "95th", "90th", "50th"]
+
+METRIC_LABELS = {metric: (ylabel, title) for _, metric, ylabel, title in GRAPH_METRICS}
+
 ALGORITHMS = ["CountMinSketch",
               "ConservativeCountMinSketch",
               "CountMeanMinSketch",
               "CountSketch",
-              "SlidingCountMinSketch"]
+              "SlidingCountMinSketch",
+              "CompactExpCountMinSketch"]
 
 
 app.layout = html.Div([
@@ -90,29 +113,13 @@ app.layout = html.Div([
         n_intervals=0
     ),
     dcc.Store(id="latest-results-store"),
+    # Per run: number of records drawn so far, and number of records when the graphs were last redrawn in full
+    dcc.Store(id="results-counts-store", data={}),
     dcc.Store(id="experiment-running-store", data=False),
 
 ])
 
 
-def load_results(filepath, max_retries=3, delay=0.2):
-    for attempt in range(max_retries):
-        try:
-            with open(filepath, "r") as file:
-                return json.load(file)
-        except json.JSONDecodeError as e:
-            print(f"[Attempt {attempt + 1}/{max_retries}] JSON decode error in file '{filepath}': {e}")
-        except FileNotFoundError:
-            print(f"[Attempt {attempt + 1}/{max_retries}] File not found: '{filepath}'")
-        except Exception as e:
-            print(f"[Attempt {attempt + 1}/{max_retries}] Unexpected error with file '{filepath}': {e}")
-
-        time.sleep(delay)
-
-    print(f"Failed to load JSON after {max_retries} attempts: '{filepath}'")
-    return None
-
-
 def generate_line_graph(x, y, name, ylabel, title):
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=x, y=y, mode='lines+markers', name=name))
@@ -126,24 +133,30 @@ def generate_line_graph(x, y, name, ylabel, title):
     return fig
 
 
-def generate_metric_graph(results, metric, ylabel, title):
+def generate_metric_graph(results, metric, ylabel, title, run=None):
+    """
+    Graph of `metric`, downsampled to MAX_POINTS points. `run` (the results log) keys the cache.
+    """
     x = [entry["processed_items"] for entry in results]
     y = [entry[metric] for entry in results]
+    x, y = DOWNSAMPLED.get((run, metric), x, y, MAX_POINTS)
     return generate_line_graph(x, y, metric, ylabel, title)
 
 
-def generate_percentile_graph(results, category):
+def generate_percentile_graph(results, category, title=None, run=None):
+    """
+    Graph of the error percentiles of `category`, each downsampled to MAX_POINTS points.
+    """
     x = [entry["processed_items"] for entry in results]
-    get = lambda p: [entry["percentiles"][category].get(p, 0.0) for entry in results]
-    percentiles = [("100th", get("100th")), ("95th", get("95th")),
-                   ("90th", get("90th")), ("50th", get("50th"))]
 
     fig = go.Figure()
-    for label, y in percentiles:
-        fig.add_trace(go.Scatter(x=x, y=y, mode='lines+markers', name=f"{label} Percentile"))
+    for label in PERCENTILES:
+        y = [entry["percentiles"][category].get(label, 0.0) for entry in results]
+        px, py = DOWNSAMPLED.get((run, category, label), x, y, MAX_POINTS)
+        fig.add_trace(go.Scatter(x=px, y=py, mode='lines+markers', name=f"{label} Percentile"))
 
     fig.update_layout(
-        title=f"{category.capitalize()} Error Percentiles Over Time",
+        title=title or f"{category.capitalize()} Error Percentiles Over Time",
         xaxis_title="Number of Processed Items",
         yaxis_title="Error Value",
         template="plotly_dark",
@@ -153,7 +166,7 @@ def generate_percentile_graph(results, category):
 
 
 def get_result_path(algorithm, dataset, width, depth, timestamp):
-    dir_path = f"../experiments/{dataset}/{algorithm}/w{width}_d{depth}/{timestamp}/results.json"
+    dir_path = f"../experiments/{dataset}/{algorithm}/w{width}_d{depth}/{timestamp}/results.jsonl"
     return dir_path
 
 
@@ -203,54 +216,139 @@ def run_experiment(n_clicks, algo1, algo2, dataset, width, depth):
     }, True  # Mark experiment as running
 
 
+def graph_cell(graph_id, figure):
+    return html.Div(dcc.Graph(id=graph_id, figure=figure), style={"width": "50%", "display": "inline-block"})
+
+
 @app.callback(
     Output('graphs-container', 'children'),
-    Input('interval-component', 'n_intervals'),
+    Output('results-counts-store', 'data'),
     Input('latest-results-store', 'data')
 )
-def update_graphs(n_intervals, results_paths):
+def build_graphs(results_paths):
+    """
+    Create empty graphs for the runs of a new experiment. `stream_graphs` then fills them in.
+    """
     if not results_paths:
-        return []
+        return [], {}
 
-    data = {}
-    for label, info in results_paths.items():
-        path = info["path"] if isinstance(info, dict) else info
-        if os.path.exists(path):
-            loaded = load_results(path)
-            if loaded:
-                data[label] = loaded
+    children = []
+    for _, metric, ylabel, title in GRAPH_METRICS:
+        children.append(html.Div([
+            graph_cell({'type': 'metric-graph', 'metric': metric, 'run': label},
+                       generate_metric_graph([], metric, ylabel, f"{title} [{label}]"))
+            for label in results_paths
+        ]))
+    for _, category in PERCENTILE_GRAPHS:
+        children.append(html.Div([
+            graph_cell({'type': 'percentile-graph', 'category': category, 'run': label},
+                       generate_percentile_graph([], category, f"{category.capitalize()} Percentiles [{label}]"))
+            for label in results_paths
+        ]))
+    return children, {}
 
-    if not data:
-        return []
 
-    children = []
+def read_run(path):
+    """
+    Return every record of a results log, parsing only the records appended since the last call.
+    """
+    if path not in RUN_READERS:
+        RUN_READERS[path] = ResultsReader(path)
+    reader = RUN_READERS[path]
+    reader.read_new()
+    return reader.records
+
+
+def bucketed(x, y, width):
+    x, y = minmax_buckets(x, y, width)
+    return x.tolist(), y.tolist()
+
+
+def metric_delta(records, metric, width):
+    x = [entry["processed_items"] for entry in records]
+    bx, by = bucketed(x, [entry[metric] for entry in records], width)
+    return dict(x=[bx], y=[by]), [0]
+
+
+def percentile_delta(records, category, width):
+    x = [entry["processed_items"] for entry in records]
+    traces = [bucketed(x, [entry["percentiles"][category].get(p, 0.0) for entry in records], width)
+              for p in PERCENTILES]
+    return dict(x=[bx for bx, _ in traces], y=[by for _, by in traces]), list(range(len(traces)))
+
+
+def metric_figure(records, metric, label, path):
+    ylabel, title = METRIC_LABELS[metric]
+    return generate_metric_graph(records, metric, ylabel, f"{title} [{label}]", path)
+
+
+def percentile_figure(records, category, label, path):
+    return generate_percentile_graph(records, category, f"{category.capitalize()} Percentiles [{label}]", path)
+
+
+@app.callback(
+    Output({'type': 'metric-graph', 'metric': ALL, 'run': ALL}, 'extendData'),
+    Output({'type': 'metric-graph', 'metric': ALL, 'run': ALL}, 'figure'),
+    Output({'type': 'percentile-graph', 'category': ALL, 'run': ALL}, 'extendData'),
+    Output({'type': 'percentile-graph', 'category': ALL, 'run': ALL}, 'figure'),
+    Output('results-counts-store', 'data', allow_duplicate=True),
+    Input('interval-component', 'n_intervals'),
+    State('latest-results-store', 'data'),
+    State('results-counts-store', 'data'),
+    prevent_initial_call=True
+)
+def stream_graphs(n_intervals, results_paths, counts):
+    """
+    Update the graphs of every run whose results log has grown since the last tick. As long as a run
+    fits in MAX_POINTS points, only its new records are pushed with extendData. Past that, its figures
+    are replaced by downsampled ones, and redrawn in full again only once the run has doubled: in between,
+    new records are pushed as the min/max points of complete buckets (see `bucket_width`). A trace thus
+    holds at most 2 * MAX_POINTS points, and the work per tick does not grow with the length of the run.
+    Nothing is sent when no run has new points.
+    """
+    metric_outputs, _, percentile_outputs, _, _ = dash.ctx.outputs_list
+    if not results_paths or not metric_outputs:
+        raise dash.exceptions.PreventUpdate
+
+    grown, new_counts = {}, dict(counts or {})
+    for label, info in results_paths.items():
+        path = info["path"] if isinstance(info, dict) else info
+        records = read_run(path)
+        drawn, redrawn_at = new_counts.get(label, (0, 0))
+        outgrown = len(records) >= 2 * redrawn_at if redrawn_at else len(records) > MAX_POINTS
+        if outgrown or len(records) < drawn:
+            # Redraw in full: the run outgrew the budget or doubled, or a resumed run truncated its log
+            grown[label] = (path, records, None)
+            new_counts[label] = (len(records), len(records) if len(records) > MAX_POINTS else 0)
+            continue
+        width = bucket_width(redrawn_at, MAX_POINTS)
+        covered = drawn + (len(records) - drawn) // width * width  # records up to the last complete bucket
+        if covered > drawn:
+            grown[label] = (path, records[drawn:covered], width)
+            new_counts[label] = (covered, redrawn_at)
+    if not grown:
+        raise dash.exceptions.PreventUpdate
 
-    # Graphs for scalar metrics
-    for graph_id, metric, ylabel, title in GRAPH_METRICS:
-        row = []
-        for label in results_paths:
-            if label in data:
-                fig = generate_metric_graph(data[label], metric, ylabel, f"{title} [{label}]")
-                row.append(html.Div(
-                    dcc.Graph(id=f"{graph_id}-{label}", figure=fig),
-                    style={"width": "50%", "display": "inline-block"}
-                ))
-        children.append(html.Div(row))
-
-    # Graphs for percentiles
-    for graph_id, category in PERCENTILE_GRAPHS:
-        row = []
-        for label in results_paths:
-            if label in data:
-                fig = generate_percentile_graph(data[label], category)
-                fig.update_layout(title=f"{category.capitalize()} Percentiles [{label}]")
-                row.append(html.Div(
-                    dcc.Graph(id=f"{graph_id}-{label}", figure=fig),
-                    style={"width": "50%", "display": "inline-block"}
-                ))
-        children.append(html.Div(row))
-
-    return children
+    def updates(outputs, key, make_delta, make_figure):
+        extend, figures = [], []
+        for output in outputs:
+            label, name = output['id']['run'], output['id'][key]
+            if label not in grown:
+                extend.append(dash.no_update)
+                figures.append(dash.no_update)
+                continue
+            path, records, width = grown[label]
+            if width is None:
+                extend.append(dash.no_update)
+                figures.append(make_figure(records, name, label, path))
+            else:
+                extend.append(make_delta(records, name, width))
+                figures.append(dash.no_update)
+        return extend, figures
+
+    return (*updates(metric_outputs, 'metric', metric_delta, metric_figure),
+            *updates(percentile_outputs, 'category', percentile_delta, percentile_figure),
+            new_counts)
 
 
 @app.callback(
@@ -10,19 +10,133 @@ Usage:
       to maintain consistency.
 """
 import numpy as np
-import heapq
+from ground_truth.base_truth import sample_mapping_keys
+from summarization_algorithms.count_min_sketch_base import CountMinSketchBase
 
+PERCENTILES = (50, 90, 95, 100)
+TOP_K = 20
 
-def evaluate_accuracy(cms, ground_truth):
+
+def query_all(cms, items):
+    """
+    Return the estimates of `items` as a numpy array: one batched `query_many` call for sketches,
+    `query` item by item for any other object with a `query` method.
+    """
+    if isinstance(cms, CountMinSketchBase):
+        return np.asarray(cms.query_many(items))
+    return np.array([cms.query(item) for item in items])
+
+
+def _percentiles(values, weights=None):
+    """
+    Return the 50th, 90th, 95th and 100th percentiles of `values` from a single np.percentile call.
+    With `weights`, every value stands for `weights` values of the population.
+    """
+    if weights is None:
+        percentiles = np.percentile(values, PERCENTILES)
+    else:
+        percentiles = np.percentile(values, PERCENTILES, weights=weights, method='inverted_cdf')
+    return {f"{q}th": value for q, value in zip(PERCENTILES, percentiles)}
+
+
+def _top_k(items, errors, k, largest):
+    """
+    Return the (item, error) pairs of the k largest (or smallest) errors, sorted like `heapq.nlargest`
+    (or `heapq.nsmallest`): by error, ties in their original order.
+    """
+    keys = -errors if largest else errors
+    if len(keys) > k:
+        kth = keys[np.argpartition(keys, k - 1)[k - 1]]
+        candidates = np.flatnonzero(keys <= kth)
+    else:
+        candidates = np.arange(len(keys))
+    top = candidates[np.argsort(keys[candidates], kind='stable')][:k]
+    return [(items[j], error) for j, error in zip(top.tolist(), errors[top].tolist())]
+
+
+def _error_metrics(errors, true_counts, weights=None):
+    """
+    Return the error metrics of the keys with the given errors and true counts.
+    With `weights`, every key stands for `weights` keys of the population.
+    """
+    abs_errors = np.abs(errors)
+    error_percentages = abs_errors / true_counts * 100
+    over = errors > 0
+    under = errors < 0
+    wrong = over | under
+    if weights is None:
+        total = len(errors)
+        over_count, under_count = np.count_nonzero(over), np.count_nonzero(under)
+        avg_error, avg_error_percentage = abs_errors.sum() / total, error_percentages.sum() / total
+        over_weights = under_weights = wrong_weights = None
+    else:
+        total = weights.sum()
+        over_count, under_count = weights[over].sum(), weights[under].sum()
+        avg_error, avg_error_percentage = weights @ abs_errors / total, weights @ error_percentages / total
+        over_weights, under_weights, wrong_weights = weights[over], weights[under], weights[wrong]
+
+    return {
+        'overestimation_percentage': over_count / total * 100,
+        'underestimation_percentage': under_count / total * 100,
+        'exact_match_percentage': (total - over_count - under_count) / total * 100,
+        'avg_error': avg_error,
+        'avg_error_percentage': avg_error_percentage,
+        'overestimation_percentiles': _percentiles(errors[over], over_weights) if over.any() else {},
+        'underestimation_percentiles': _percentiles(abs_errors[under], under_weights) if under.any() else {},
+        'combined_percentiles': _percentiles(abs_errors[wrong], wrong_weights) if wrong.any() else {},
+    }
+
+
+def _bootstrap_intervals(errors, true_counts, weights, n_heavy, confidence, n_bootstrap, rng):
+    """
+    Bootstrap confidence intervals of the error metrics of a stratified sample: the first `n_heavy`
+    keys (the heavy hitters) are exact and kept, the tail sample is resampled with replacement.
+    """
+    n_tail = len(errors) - n_heavy
+    replicates = []
+    for _ in range(n_bootstrap):
+        tail = n_heavy + rng.integers(0, n_tail, size=n_tail) if n_tail else np.empty(0, dtype=np.int64)
+        resample = np.concatenate([np.arange(n_heavy), tail])
+        replicates.append(_error_metrics(errors[resample], true_counts[resample], weights[resample]))
+
+    bounds = [(1 - confidence) / 2 * 100, (1 + confidence) / 2 * 100]
+    intervals = {}
+    for metric, value in replicates[0].items():
+        if isinstance(value, dict):
+            intervals[metric] = {}
+            for q in (f"{q}th" for q in PERCENTILES):
+                values = [replicate[metric][q] for replicate in replicates if replicate[metric]]
+                if values:
+                    intervals[metric][q] = np.percentile(values, bounds).tolist()
+        else:
+            intervals[metric] = np.percentile([replicate[metric] for replicate in replicates], bounds).tolist()
+    return intervals
+
+
+def evaluate_accuracy(cms, ground_truth, sample_size=None, heavy_threshold=None, confidence=0.95, n_bootstrap=100,
+                      seed=None):
     """
     Evaluates the accuracy of a given Count-Min Sketch instance.
 
     If you use it mid-stream, be aware the CMS will keep evolving while the evaluation runs.
     Pass a copied CMS and ground_truth instances instead of the live ones.
 
+    The ground truth is turned into parallel key/count arrays once, and every statistic is computed
+    with array operations over the estimates of all keys.
+
+    With `sample_size`, only the heavy hitters (true count >= heavy_threshold) and a uniform sample of
+    `sample_size` other keys are evaluated. The metrics weight every sampled key by the size of the tail
+    over the size of the sample, and come with bootstrap confidence intervals. Truths that implement
+    `sample_keys` draw the sample without scanning every key, so the cost stays constant as the stream grows.
+
     Args:
         cms: A CountMinSketch instance.
         ground_truth: A dictionary with ground truth counts.
+        sample_size: Number of tail keys to sample, or None to evaluate every key.
+        heavy_threshold: True count from which keys are always evaluated (sampling mode only).
+        confidence: Confidence level of the intervals (sampling mode only).
+        n_bootstrap: Number of bootstrap replicates (sampling mode only).
+        seed: Seed of the sampling and bootstrap random generator.
 
     Returns:
         A dictionary containing the following:
@@ -32,89 +146,49 @@ def evaluate_accuracy(cms, ground_truth):
             - 'overestimation_percentage': Overestimation percentage
             - 'percentiles': Dict with error percentiles (50th, 90th, 95th, 100th)
             - 'overestimated_items': List of (item, error), sorted by error desc
+        In sampling mode, also:
+            - 'sample_size': Number of evaluated keys
+            - 'sampled_items': The evaluated keys
+            - 'confidence_intervals': [low, high] bounds of every metric and percentile
     """
     if not cms or not ground_truth:
         return "\nNo data to evaluate"
 
-    test_items = list(ground_truth.keys())
+    weights = None
+    if sample_size is None:
+        test_items = list(ground_truth.keys())
+    else:
+        rng = np.random.default_rng(seed)
+        if hasattr(ground_truth, 'sample_keys'):
+            heavy, tail, tail_size = ground_truth.sample_keys(sample_size, heavy_threshold, rng)
+        else:
+            heavy, tail, tail_size = sample_mapping_keys(ground_truth, sample_size, heavy_threshold, rng)
+        test_items = heavy + tail
+        weights = np.concatenate([np.ones(len(heavy)), np.full(len(tail), tail_size / max(len(tail), 1))])
     dataset_length = len(test_items)
 
     if not dataset_length:
         return "\nNo items processed"
 
-    errors = []
-    overestimations = []
-    underestimations = []
-    correct_count = 0
-
-    for item in test_items:
-        error = cms[item] - ground_truth[item]
-        errors.append(error)
-
-        if error == 0:
-            correct_count += 1
-        elif error > 0:
-            overestimations.append((item, error))
-        else:
-            underestimations.append((item, error))
-
-    avg_error = sum(abs(error) for error in errors) / dataset_length
-
-    avg_error_percentage = sum(abs(err) / ground_truth[item] * 100 for item, err in zip(test_items, errors)) / dataset_length
-    max_error_percentage = max(abs(err) / ground_truth[item] * 100 for item, err in zip(test_items, errors))
-
-    exact_match_percentage = (correct_count / dataset_length) * 100
-    overestimation_percentage = (len(overestimations) / dataset_length) * 100
-    underestimation_percentage = (len(underestimations) / dataset_length) * 100
-
-    top_20_overestimations = heapq.nlargest(20, overestimations, key=lambda x: x[1])
-    top_20_underestimations = heapq.nsmallest(20, underestimations, key=lambda x: x[1])
-
-    overestimation_percentiles = {}
-    underestimation_percentiles = {}
-    combined_percentiles = {}
-    overestimation_errors = [error for _, error in overestimations]
-    underestimation_errors = [abs(error) for _, error in underestimations]
-    combined = overestimation_errors + underestimation_errors
-    abs_combined = [abs(e) for e in combined]
-
-    if overestimations:
-        overestimation_percentiles = {
-            "50th": np.percentile(overestimation_errors, 50),
-            "90th": np.percentile(overestimation_errors, 90),
-            "95th": np.percentile(overestimation_errors, 95),
-            "100th": np.percentile(overestimation_errors, 100)
-        }
-
-    if underestimations:
-        underestimation_percentiles = {
-            "50th": np.percentile(underestimation_errors, 50),
-            "90th": np.percentile(underestimation_errors, 90),
-            "95th": np.percentile(underestimation_errors, 95),
-            "100th": np.percentile(underestimation_errors, 100)
-        }
-
-    if underestimations or overestimations:
-        combined_percentiles = {
-            "50th": np.percentile(abs_combined, 50),
-            "90th": np.percentile(abs_combined, 90),
-            "95th": np.percentile(abs_combined, 95),
-            "100th": np.percentile(abs_combined, 100)
-        }
-
-    return {
-        'overestimation_percentage': overestimation_percentage,
-        'underestimation_percentage': underestimation_percentage,
-        'exact_match_percentage': exact_match_percentage,
-        'avg_error': avg_error,
-        'avg_error_percentage': avg_error_percentage,
-        'max_error_percentage': max_error_percentage,
-        'overestimation_percentiles': overestimation_percentiles,
-        'underestimation_percentiles': underestimation_percentiles,
-        'combined_percentiles': combined_percentiles,
-        'top_20_overestimations': top_20_overestimations,
-        'top_20_underestimations': top_20_underestimations
-    }
+    true_counts = np.array([ground_truth[item] for item in test_items])
+    errors = query_all(cms, test_items) - true_counts
+    over = errors > 0
+    under = errors < 0
+    over_items = [item for item, flag in zip(test_items, over.tolist()) if flag]
+    under_items = [item for item, flag in zip(test_items, under.tolist()) if flag]
+
+    accuracy = _error_metrics(errors, true_counts, weights)
+    accuracy.update({
+        'max_error_percentage': (np.abs(errors) / true_counts * 100).max(),
+        'top_20_overestimations': _top_k(over_items, errors[over], TOP_K, largest=True),
+        'top_20_underestimations': _top_k(under_items, errors[under], TOP_K, largest=False)
+    })
+    if weights is not None:
+        accuracy['sample_size'] = dataset_length
+        accuracy['sampled_items'] = test_items
+        accuracy['confidence_intervals'] = _bootstrap_intervals(errors, true_counts, weights, len(heavy), confidence,
+                                                                n_bootstrap, rng)
+    return accuracy
 
 
 def print_accuracy_evaluation(accuracy):
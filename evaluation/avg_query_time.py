@@ -2,7 +2,7 @@ import random
 import time
 
 
-def evaluate_avg_query_time(cms, ground_truth, threshold=100000):
+def evaluate_avg_query_time(cms, ground_truth, threshold=100000, test_items=None):
     """
     Evaluates the average time of the query method of Sketch variation.
 
@@ -10,15 +10,19 @@ def evaluate_avg_query_time(cms, ground_truth, threshold=100000):
         cms: The CountMinSketch instance to test.
         ground_truth: A dictionary containing the actual counts of items.
         threshold: The size above which sampling is used.
+        test_items: Keys to time instead of the keys of `ground_truth`, e.g. the keys sampled by a
+            sampled accuracy evaluation, so the cost does not grow with the key set.
 
     Returns:
         Average query time per item.
     """
-    total_items = len(ground_truth)
-    if not total_items:  # nothing to evaluate
+    if test_items is not None:
+        test_items = test_items[:threshold]
+        if not test_items:
+            return 0
+    elif not len(ground_truth):  # nothing to evaluate
         return 0
-
-    if total_items > threshold:
+    elif len(ground_truth) > threshold:
         test_items = random.sample(list(ground_truth.keys()), threshold)  # randomly sample 'threshold' items
     else:
         test_items = list(ground_truth.keys())
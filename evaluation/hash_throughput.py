@@ -0,0 +1,49 @@
+"""
+hash_throughput.py
+
+Micro-benchmark of the hash families in `summarization_algorithms.hashing`.
+
+Usage:
+    python -m evaluation.hash_throughput
+"""
+import time
+import numpy as np
+from summarization_algorithms.hashing import HASH_FAMILIES, get_hash_family
+
+
+def evaluate_hash_throughput(hash_family, items, depth, width, batched=False):
+    """
+    Measures how many items per second a hash family maps to `depth` column indices.
+
+    Args:
+        hash_family: A HashFamily instance or the name of one.
+        items: The items to hash.
+        depth: Number of rows of the sketch.
+        width: Number of columns of the sketch.
+        batched: Use `indices_many` on all items at once instead of `indices` item by item.
+
+    Returns:
+        Hashed items per second.
+    """
+    hash_family = get_hash_family(hash_family)
+    start_time = time.perf_counter()
+    if batched:
+        hash_family.indices_many(items, depth, width)
+    else:
+        for item in items:
+            hash_family.indices(item, depth, width)
+    elapsed = time.perf_counter() - start_time
+
+    return len(items) / elapsed if elapsed > 0 else float('inf')
+
+
+def print_hash_throughput(name, items_per_second):
+    print(f"{name:>20}: {items_per_second:,.0f} items/s")
+
+
+if __name__ == '__main__':
+    ITEMS = np.random.default_rng(0).zipf(1.3, size=100000)
+    for family_name in HASH_FAMILIES:
+        print_hash_throughput(family_name, evaluate_hash_throughput(family_name, ITEMS.tolist(), depth=5, width=10000))
+        print_hash_throughput(f"{family_name} (batched)",
+                              evaluate_hash_throughput(family_name, ITEMS, depth=5, width=10000, batched=True))
@@ -1,11 +1,101 @@
 import abc
+from collections.abc import Mapping
+
+_MISSING = object()
+
+
+class TruthSnapshot(Mapping):
+    """
+    Read-only view of the counts of a truth as they were when `snapshot()` was called.
+    The view shares the live dict; the truth saves the old value of a key before changing it
+    for the first time after the snapshot (copy-on-write), so taking a snapshot costs O(1).
+    Taking a newer snapshot of the same truth ends the epoch of this one.
+    """
+    def __init__(self, truth, epoch, saved):
+        self._truth = truth
+        self._epoch = epoch
+        self._saved = saved
+
+    def _check_epoch(self):
+        if self._truth._epoch != self._epoch:
+            raise RuntimeError("Stale truth snapshot: a newer snapshot was taken.")
+
+    def __getitem__(self, item):
+        self._check_epoch()
+        if item in self._saved:
+            value = self._saved[item]
+            if value is _MISSING:
+                raise KeyError(item)
+            return value
+        return self._truth.counts[item]
+
+    def __iter__(self):
+        self._check_epoch()
+        for item in self._truth.counts:
+            if item not in self._saved:
+                yield item
+        for item, value in self._saved.items():
+            if value is not _MISSING:
+                yield item
+
+    def sample_keys(self, sample_size, heavy_threshold, rng):
+        """
+        Delegate to the truth while it is unchanged since the snapshot, otherwise scan the view.
+        """
+        self._check_epoch()
+        if not self._saved:
+            return self._truth.sample_keys(sample_size, heavy_threshold, rng)
+        return sample_mapping_keys(self, sample_size, heavy_threshold, rng)
+
+    def __len__(self):
+        self._check_epoch()
+        counts = self._truth.counts
+        return (len(counts) - sum(1 for item in self._saved if item in counts)
+                + sum(1 for value in self._saved.values() if value is not _MISSING))
+
+
+def sample_mapping_keys(counts, sample_size, heavy_threshold, rng):
+    """
+    Split the keys of the mapping `counts` into heavy hitters (count >= heavy_threshold) and the tail,
+    and draw a uniform sample of at most `sample_size` tail keys. Scans every key.
+
+    Returns:
+        The heavy hitters, the sampled tail keys and the number of tail keys.
+    """
+    heavy, tail = [], []
+    for item, count in counts.items():
+        (heavy if heavy_threshold is not None and count >= heavy_threshold else tail).append(item)
+    sample = rng.choice(len(tail), size=min(sample_size, len(tail)), replace=False)
+    return heavy, [tail[j] for j in sample.tolist()], len(tail)
 
 
 class BaseTruth(abc.ABC):
+    """
+    Subclasses change counts only through `_set_count`, which keeps `self.counts` (without zero counts),
+    an indexable list of the keys and, if `heavy_threshold` is set, the set of keys whose count is at
+    least `heavy_threshold`. Both make `sample_keys` independent of the number of keys.
+    """
+    _epoch = 0
+    _saved = None
+
+    def __init__(self, heavy_threshold=None):
+        self.counts = {}
+        self.heavy_threshold = heavy_threshold
+        self._keys = []
+        self._key_positions = {}
+        self._heavy = set()
+
     @abc.abstractmethod
     def add(self, item):
         pass
 
+    def add_many(self, items):
+        """
+        Add every element of `items`, in order. The default implementation calls `add` item by item.
+        """
+        for item in items:
+            self.add(item)
+
     @abc.abstractmethod
     def get_all(self):
         pass
@@ -14,6 +104,61 @@ class BaseTruth(abc.ABC):
     def query(self, item):
         pass
 
+    def snapshot(self):
+        """
+        Return a frozen TruthSnapshot of the counts without copying them.
+        """
+        self._epoch += 1
+        self._saved = {}
+        return TruthSnapshot(self, self._epoch, self._saved)
+
+    def _set_count(self, item, count):
+        """
+        Set the count of `item`, removing it when the count drops to 0.
+        """
+        self._before_write(item)
+        old_count = self.counts.get(item, 0)
+        if count:
+            if not old_count:
+                self._key_positions[item] = len(self._keys)
+                self._keys.append(item)
+            self.counts[item] = count
+        else:
+            del self.counts[item]
+            # Move the last key into the hole left by `item`
+            position = self._key_positions.pop(item)
+            last = self._keys.pop()
+            if position < len(self._keys):
+                self._keys[position] = last
+                self._key_positions[last] = position
+
+        if self.heavy_threshold is not None:
+            if count >= self.heavy_threshold > old_count:
+                self._heavy.add(item)
+            elif old_count >= self.heavy_threshold > count:
+                self._heavy.discard(item)
+
+    def sample_keys(self, sample_size, heavy_threshold, rng):
+        """
+        Return the heavy hitters (count >= heavy_threshold), a uniform sample of at most `sample_size`
+        of the other keys and the number of other keys. Costs O(sample_size + heavy hitters) when
+        `heavy_threshold` is the tracked one, and scans every key otherwise.
+        """
+        if heavy_threshold != self.heavy_threshold:
+            return sample_mapping_keys(self.counts, sample_size, heavy_threshold, rng)
+        heavy = list(self._heavy)
+        tail_size = len(self._keys) - len(heavy)
+        # Draw enough positions to be left with `sample_size` tail keys once the heavy hitters are skipped
+        draws = rng.choice(len(self._keys), size=min(sample_size + len(heavy), len(self._keys)), replace=False)
+        tail = [item for item in (self._keys[j] for j in draws.tolist()) if item not in self._heavy]
+        return heavy, tail[:sample_size], tail_size
+
+    def _before_write(self, item):
+        """
+        Save the snapshot value of `item` before its first change since the last snapshot.
+        """
+        if self._saved is not None and item not in self._saved:
+            self._saved[item] = self.counts.get(item, _MISSING)
+
     def __getitem__(self, item):
         return self.query(item)
-    
\ No newline at end of file
@@ -1,12 +1,24 @@
+from collections import Counter
+import numpy as np
 from ground_truth.base_truth import BaseTruth
 
 
 class Truth(BaseTruth):
-    def __init__(self):
-        self.counts = {}
-
     def add(self, item):
-        self.counts[item] = self.counts.get(item, 0) + 1
+        self._set_count(item, self.counts.get(item, 0) + 1)
+
+    def add_many(self, items):
+        """
+        Add every element of `items`, updating each distinct item once.
+        The elements of a numpy array are counted with numpy and stored as Python integers.
+        """
+        if isinstance(items, np.ndarray):
+            keys, counts = np.unique(items, return_counts=True)
+            batch = zip(keys.tolist(), counts.tolist())
+        else:
+            batch = Counter(items).items()
+        for item, count in batch:
+            self._set_count(item, self.counts.get(item, 0) + count)
 
     def query(self, item):
         return self.counts.get(item, 0)
@@ -0,0 +1,126 @@
+"""
+dataset_cache.py
+
+Pre-tokenized binary cache of a dataset, for repeated experiments on the same data.
+
+Compiling a dataset parses it once and stores, next to it:
+    - <dataset>.ids.npy: the stream as uint32 token IDs, in order (memory-mapped by later runs);
+    - <dataset>.vocab.json: the vocabulary, the token of every ID;
+    - <dataset>.cache.json: the size, modification time and SHA-256 of the source, and the reading
+      options (CSV field, numeric parsing) the cache was compiled with.
+A cache is stale when the options differ or the source changed. The size and modification time are
+checked first; only when the modification time differs is the source hashed, so touching a file
+without changing it does not force a recompilation.
+
+Compile from the command line with:
+    python -m input_stream.dataset_cache <dataset path> [--field FIELD] [--numeric]
+"""
+import argparse
+import hashlib
+import json
+import os
+import numpy as np
+
+CACHE_VERSION = 1
+MAX_VOCABULARY = 2 ** 32
+
+
+def cache_paths(dataset_path):
+    """
+    Return the (ids, vocabulary, metadata) paths of the cache of a dataset.
+    """
+    return dataset_path + ".ids.npy", dataset_path + ".vocab.json", dataset_path + ".cache.json"
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_atomic(path, write):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def is_fresh(dataset_path, options):
+    """
+    Return True if the cache of the dataset exists and matches its current content and `options`.
+    """
+    ids_path, vocab_path, meta_path = cache_paths(dataset_path)
+    if not all(os.path.exists(path) for path in (ids_path, vocab_path, meta_path)):
+        return False
+    with open(meta_path, "r") as f:
+        meta = json.load(f)
+    stat = os.stat(dataset_path)
+    if meta["version"] != CACHE_VERSION or meta["options"] != options or meta["size"] != stat.st_size:
+        return False
+    if meta["mtime_ns"] == stat.st_mtime_ns:
+        return True
+    if meta["sha256"] != _file_hash(dataset_path):
+        return False
+    meta["mtime_ns"] = stat.st_mtime_ns  # same content: remember the new time to skip hashing next time
+    _write_atomic(meta_path, lambda f: f.write(json.dumps(meta).encode("utf-8")))
+    return True
+
+
+def compile_dataset(dataset_path, blocks, options):
+    """
+    Write the cache of a dataset from `blocks`, the token lists (or arrays) read from it.
+    IDs are assigned in order of first appearance. The metadata is written last, so an interrupted
+    compilation leaves a stale cache, never a wrong one.
+    """
+    ids_path, vocab_path, meta_path = cache_paths(dataset_path)
+    stat = os.stat(dataset_path)
+    vocabulary = {}
+    chunks = []
+    for block in blocks:
+        tokens = block.tolist() if isinstance(block, np.ndarray) else block
+        chunks.append(np.fromiter((vocabulary.setdefault(token, len(vocabulary)) for token in tokens),
+                                  dtype=np.int64, count=len(tokens)))
+        if len(vocabulary) > MAX_VOCABULARY:
+            raise ValueError(f"{dataset_path} has more than {MAX_VOCABULARY} distinct tokens")
+    ids = np.concatenate(chunks).astype(np.uint32) if chunks else np.empty(0, dtype=np.uint32)
+
+    _write_atomic(ids_path, lambda f: np.save(f, ids))
+    _write_atomic(vocab_path, lambda f: f.write(json.dumps(list(vocabulary)).encode("utf-8")))
+    meta = {"version": CACHE_VERSION, "options": options, "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns, "sha256": _file_hash(dataset_path), "tokens": len(ids)}
+    _write_atomic(meta_path, lambda f: f.write(json.dumps(meta).encode("utf-8")))
+
+
+def load_token_ids(dataset_path, options, read_blocks):
+    """
+    Return the token IDs of the dataset as a read-only memory-mapped uint32 array, compiling the
+    cache first with the blocks of `read_blocks()` if it is missing or stale.
+    """
+    if not is_fresh(dataset_path, options):
+        compile_dataset(dataset_path, read_blocks(), options)
+    return np.load(cache_paths(dataset_path)[0], mmap_mode="r")
+
+
+def load_vocabulary(dataset_path):
+    """
+    Return the list of tokens of the cache, indexed by token ID.
+    """
+    with open(cache_paths(dataset_path)[1], "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+if __name__ == '__main__':
+    from input_stream.dataset_stream_simulator import DatasetStreamSimulator
+
+    parser = argparse.ArgumentParser(description="Compile a dataset into its token ID cache")
+    parser.add_argument('dataset_path')
+    parser.add_argument('--field', help='Column holding the text, for CSV datasets')
+    parser.add_argument('--numeric', action='store_true', help='Parse a .txt dataset as integer tokens')
+    args = parser.parse_args()
+
+    simulator = DatasetStreamSimulator(args.dataset_path, args.field, sleep_time=0, numeric=args.numeric,
+                                       use_cache=True)
+    ids = simulator.compile_cache()
+    print(f"{len(ids)} tokens, {len(load_vocabulary(args.dataset_path))} distinct")
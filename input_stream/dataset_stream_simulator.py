@@ -1,43 +1,159 @@
+import bz2
 import csv
+import datetime
+import gzip
+import io
+import lzma
 import os
-import time
-from input_stream.stream_simulator_base import StreamSimulator
+from input_stream.dataset_cache import load_token_ids
+from input_stream.int_tokenizer import iter_int_chunks, iter_int_chunks_from_file
+from input_stream.stream_simulator_base import StreamSimulator, prefetch_blocks
+
+READ_BUFFER_SIZE = 1 << 20  # bytes read from the dataset at a time
+BLOCK_TOKENS = 1 << 16  # tokens gathered from CSV rows before handing them over
+CACHE_BLOCK_TOKENS = 1 << 20  # token IDs handed over at a time from the dataset cache
+COMPRESSIONS = {".gz": gzip, ".bz2": bz2, ".xz": lzma, ".lzma": lzma}  # extension -> module with open()
+
+
+def _parse_timestamp(value):
+    """
+    Return a recorded time in seconds, from a number of seconds or an ISO 8601 date.
+    """
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.datetime.fromisoformat(value.strip()).timestamp()
 
 
 class DatasetStreamSimulator(StreamSimulator):
     """
     Simulates a real-time data stream from a CSV dataset.
+    CSV and TXT datasets may be compressed (.gz, .bz2, .xz, e.g. "trace.csv.gz"); they are then
+    decompressed on the fly by a reader thread that prepares the next blocks while the current one
+    is being processed.
+    With `numeric`, a .txt dataset of integer tokens (e.g. Kosarak) is parsed straight into int64 arrays.
+    With `use_cache`, the stream is read as uint32 token IDs from the dataset cache (see dataset_cache),
+    which is compiled on first use.
+    With `timestamp_field`, a CSV dataset is replayed at the times recorded in that column (seconds or
+    ISO 8601 dates), `speedup` times faster, instead of at a fixed rate.
     """
-    def __init__(self, dataset_path, field_name, sleep_time=0.01):
-        super().__init__(sleep_time)
+    def __init__(self, dataset_path, field_name, sleep_time=0.01, numeric=False, use_cache=False, rate=None,
+                 timestamp_field=None, speedup=1.0):
+        super().__init__(sleep_time, rate, speedup)
         self.dataset_path = dataset_path
         self.field_name = field_name
-        self.file_ext = os.path.splitext(dataset_path)[1].lower()
+        self.numeric = numeric
+        self.use_cache = use_cache
+        self.timestamp_field = timestamp_field
+        root, ext = os.path.splitext(dataset_path)
+        self.compression = ext.lower() if ext.lower() in COMPRESSIONS else None
+        if self.compression:
+            root, ext = os.path.splitext(root)
+        self.file_ext = ext.lower()
+        if timestamp_field and (self.file_ext != ".csv" or use_cache):
+            raise ValueError("Timestamp replay needs a CSV dataset read without the cache")
+
+    def _read_timed_blocks(self):
+        if self.timestamp_field:
+            return self._prefetch(self._timed_blocks_from_csv(self.timestamp_field))
+        return super()._read_timed_blocks()
+
+    def _read_blocks(self):
+        if self.use_cache:
+            return self._blocks_from_cache()
+        return self._parse_blocks()
+
+    def compile_cache(self):
+        """
+        Compile the dataset cache if it is missing or stale, and return the memory-mapped token IDs.
+        """
+        options = {"field": self.field_name if self.file_ext == ".csv" else None, "numeric": self.numeric}
+        return load_token_ids(self.dataset_path, options, self._parse_blocks)
+
+    def _blocks_from_cache(self):
+        ids = self.compile_cache()
+        for start in range(0, len(ids), CACHE_BLOCK_TOKENS):
+            yield ids[start:start + CACHE_BLOCK_TOKENS]
 
-    def simulate_stream(self):
+    def _parse_blocks(self):
         if self.file_ext == ".csv":
-            return self._stream_from_csv()
+            return self._prefetch(self._blocks_from_csv())
         elif self.file_ext == ".txt":
-            return self._stream_from_txt()
+            if not self.numeric:
+                return self._prefetch(self._blocks_from_txt())
+            if self.compression:
+                return self._prefetch(self._int_chunks_from_compressed())
+            return iter_int_chunks(self.dataset_path)
         else:
             raise ValueError(f"Unsupported file type: {self.file_ext}")
 
-    def _stream_from_csv(self):
-        with open(self.dataset_path, "r", encoding="utf-8") as file:
-            reader = csv.DictReader(file)
+    def _prefetch(self, blocks):
+        """
+        Read compressed datasets in a background thread; plain files are read in place.
+        """
+        return prefetch_blocks(blocks) if self.compression else blocks
+
+    def _open_binary(self):
+        if self.compression:
+            return io.BufferedReader(COMPRESSIONS[self.compression].open(self.dataset_path, "rb"), READ_BUFFER_SIZE)
+        return open(self.dataset_path, "rb", buffering=READ_BUFFER_SIZE)
+
+    def _open_text(self):
+        return io.TextIOWrapper(self._open_binary(), encoding="utf-8")
+
+    def _int_chunks_from_compressed(self):
+        with self._open_binary() as file:
+            yield from iter_int_chunks_from_file(file)
+
+    def _blocks_from_csv(self):
+        for block, _ in self._timed_blocks_from_csv():
+            yield block
+
+    def _column(self, header, name):
+        if name not in header:
+            raise ValueError(f"Column {name} not found in {self.dataset_path}")
+        return header.index(name)
+
+    def _timed_blocks_from_csv(self, timestamp_field=None):
+        """
+        Yield the words of the `field_name` column, with the timestamps of their rows if
+        `timestamp_field` is given (None otherwise). Rows are parsed as plain lists and only the
+        needed columns are read, instead of building a dict per row.
+        """
+        with self._open_text() as file:
+            reader = csv.reader(file)
             if not self.field_name:
                 raise ValueError("field_name must be specified for CSV files.")
+            header = next(reader, None)
+            if header is None:
+                return
+            column = self._column(header, self.field_name)
+            time_column = self._column(header, timestamp_field) if timestamp_field else None
+
+            block, timestamps = [], []
             for row in reader:
-                data = row.get(self.field_name)
-                if data:
-                    for word in data.split():
-                        yield word
-                        time.sleep(self.sleep_time)
-
-    def _stream_from_txt(self):
-        with open(self.dataset_path, "r", encoding="utf-8") as file:
-            for line in file:
-                tokens = line.strip().split()
-                for token in tokens:
-                    yield token
-                    time.sleep(self.sleep_time)
+                if len(row) > column and row[column]:
+                    words = row[column].split()
+                    block.extend(words)
+                    if time_column is not None:
+                        timestamps.extend([_parse_timestamp(row[time_column])] * len(words))
+                    if len(block) >= BLOCK_TOKENS:
+                        yield block, timestamps if time_column is not None else None
+                        block, timestamps = [], []
+            if block:
+                yield block, timestamps if time_column is not None else None
+
+    def _blocks_from_txt(self):
+        """
+        Yield the whitespace-separated tokens of the file, reading it in large blocks.
+        A token cut by the end of a block is carried over to the next one.
+        """
+        with self._open_text() as file:
+            tail = ""
+            for chunk in iter(lambda: file.read(READ_BUFFER_SIZE), ""):
+                text = tail + chunk
+                tokens = text.split()
+                tail = tokens.pop() if tokens and not text[-1].isspace() else ""
+                yield tokens
+            if tail:
+                yield [tail]
@@ -0,0 +1,144 @@
+"""
+int_tokenizer.py
+
+Fast loader for whitespace-separated integer datasets, such as the Kosarak transaction files.
+
+The file is memory-mapped and parsed in chunks directly from its bytes into int64 numpy arrays, so no
+Python object is created per token and no text is decoded. A chunk is a view of the mapping that is
+parsed in place; only the values are allocated. `line_aligned_ranges` splits a file into byte ranges that start and
+end on line boundaries, so each range can be tokenized by a different process.
+
+Only non-negative integers below 2^63 - 1 are accepted; any other token raises ValueError.
+"""
+import multiprocessing
+import os
+import numpy as np
+
+CHUNK_SIZE = 1 << 24  # bytes parsed at a time
+NEWLINE_WINDOW = 1 << 16  # bytes searched for the next newline at a range boundary, doubled until one is found
+INT64_MAX = np.iinfo(np.int64).max
+
+_WHITESPACE = np.zeros(256, dtype=bool)
+_WHITESPACE[list(b" \t\n\r\v\f")] = True
+# Byte classes: 0 invalid, 1 whitespace, 2 digit
+_BYTE_CLASS = _WHITESPACE.astype(np.uint8)
+_BYTE_CLASS[ord("0"):ord("9") + 1] = 2
+
+
+def _map(path):
+    """
+    Return a read-only uint8 memory map of the file, or an empty array for an empty file
+    (which numpy cannot map).
+    """
+    if os.path.getsize(path) == 0:
+        return np.empty(0, dtype=np.uint8)
+    return np.memmap(path, dtype=np.uint8, mode="r")
+
+
+def _parse_chunk(data):
+    """
+    Parse the integers of `data`, a uint8 array that does not start or end inside a token.
+    numpy's text parser reads the mapped bytes in place; the bytes are validated first because
+    it would otherwise silently stop at the first invalid token.
+    """
+    classes = _BYTE_CLASS[data]
+    if len(classes) and classes.min() == 0:
+        raise ValueError("Only whitespace-separated non-negative integers can be tokenized")
+    if not len(classes) or classes.max() < 2:  # the parser would read a lone 0 from blank text
+        return np.empty(0, dtype=np.int64)
+    values = np.fromstring(data, dtype=np.int64, sep=" ")
+    if len(values) and values.max() == INT64_MAX:  # the parser saturates on overflow
+        raise ValueError("Integer token does not fit in an int64")
+    return values
+
+
+def _next_line(data, position):
+    """
+    Return the position right after the first newline at or after `position`, or len(data) if there is none.
+    The search looks at a bounded window, widened until it finds a newline, so it only reads about a line.
+    """
+    window = NEWLINE_WINDOW
+    while position < len(data):
+        newlines = np.flatnonzero(data[position:position + window] == ord("\n"))
+        if len(newlines):
+            return position + newlines[0] + 1
+        position += window
+        window *= 2
+    return len(data)
+
+
+def line_aligned_ranges(path, parts):
+    """
+    Split the file into at most `parts` byte ranges (start, end) of roughly equal size.
+    Every range but the first starts right after a newline, so no line is split across two ranges.
+    """
+    data = _map(path)
+    size = len(data)
+    bounds = [0]
+    for i in range(1, parts):
+        position = _next_line(data, max(size * i // parts, bounds[-1]))
+        if position > bounds[-1]:
+            bounds.append(position)
+    if bounds[-1] < size:
+        bounds.append(size)
+    return [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def iter_int_chunks(path, start=0, end=None, chunk_size=CHUNK_SIZE):
+    """
+    Yield the integers of bytes [start, end) of the file as int64 arrays, one per chunk.
+    `start` and `end` must not fall inside a token (line boundaries are safe).
+    """
+    data = _map(path)
+    end = len(data) if end is None else end
+    position = start
+    while position < end:
+        stop = min(position + chunk_size, end)
+        if stop < end:
+            # Cut the chunk after its last whitespace, so no token is split between two chunks
+            window = max(position, stop - 1024)
+            spaces = np.flatnonzero(_WHITESPACE[data[window:stop]])
+            if not len(spaces):
+                raise ValueError(f"No whitespace in the 1024 bytes before offset {stop}")
+            stop = window + spaces[-1] + 1
+        values = _parse_chunk(data[position:stop])
+        if len(values):
+            yield values
+        position = stop
+
+
+def iter_int_chunks_from_file(file, chunk_size=CHUNK_SIZE):
+    """
+    Yield the integers read from a binary file object as int64 arrays, one per chunk of about
+    `chunk_size` bytes. For streams that cannot be memory-mapped, such as decompressed files.
+    """
+    tail = b""
+    for data in iter(lambda: file.read(chunk_size), b""):
+        data = tail + data
+        cut = max(data.rfind(space) for space in (b" ", b"\t", b"\n", b"\r", b"\v", b"\f")) + 1
+        tail = data[cut:]
+        values = _parse_chunk(np.frombuffer(data, dtype=np.uint8, count=cut))
+        if len(values):
+            yield values
+    if tail:
+        yield _parse_chunk(np.frombuffer(tail, dtype=np.uint8))
+
+
+def read_int_tokens(path, start=0, end=None):
+    """
+    Return the integers of bytes [start, end) of the file as a single int64 array.
+    """
+    chunks = list(iter_int_chunks(path, start, end))
+    return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+
+
+def load_int_tokens(path, workers=1):
+    """
+    Return every integer of the file, in order, tokenizing line-aligned ranges in `workers` processes.
+    """
+    ranges = line_aligned_ranges(path, workers)
+    if workers <= 1 or len(ranges) <= 1:
+        return read_int_tokens(path)
+    with multiprocessing.Pool(min(workers, len(ranges))) as pool:
+        chunks = pool.starmap(read_int_tokens, [(path, start, end) for start, end in ranges])
+    return np.concatenate(chunks)
@@ -1,24 +1,81 @@
-import time
 import numpy as np
 from input_stream.stream_simulator_base import StreamSimulator
 
+DISTRIBUTIONS = ("zipf", "uniform", "drifting_zipf", "bursty")
+DEFAULT_VOCABULARY_SIZE = 100000  # used by the distributions that need a finite vocabulary when none is given
+
 
 class RandomStreamSimulator(StreamSimulator):
     """
-    Simulates a simple data stream by generating items at a controlled rate.
+    Simulates a data stream of integer items drawn from a seeded random distribution.
+
+    The stream is generated in int64 arrays of `chunk_size` items, so its memory does not depend on
+    `stream_size`, which may be None for an endless stream. The same seed always replays the same stream.
+
+    Distributions:
+        - "zipf": Zipf with parameter `zipf_param`, unbounded or over 1..vocabulary_size if set.
+        - "uniform": uniform over 1..vocabulary_size.
+        - "drifting_zipf": Zipf over 1..vocabulary_size whose ranking rotates by one item every
+          `drift_interval` items, so the heavy hitters change over time.
+        - "bursty": Zipf over 1..vocabulary_size; every `burst_interval` items starts a burst of
+          `burst_length` items, a `burst_share` of which is a new heavy hitter never seen before.
     """
-    def __init__(self, sleep_time=0.00001, stream_size=500000, zipf_param=1.3):
-        super().__init__(sleep_time)
+    def __init__(self, sleep_time=0.00001, stream_size=500000, zipf_param=1.3, seed=None, distribution="zipf",
+                 vocabulary_size=None, chunk_size=1 << 16, drift_interval=10000, burst_interval=50000,
+                 burst_length=5000, burst_share=0.5, rate=None):
+        super().__init__(sleep_time, rate)
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown distribution: {distribution}")
         self.stream_size = stream_size
         self.zipf_param = zipf_param
+        self.seed = seed  # a fixed seed replays the same stream, e.g. when resuming from a checkpoint
+        self.distribution = distribution
+        if vocabulary_size is None and distribution != "zipf":
+            vocabulary_size = DEFAULT_VOCABULARY_SIZE
+        self.vocabulary_size = vocabulary_size
+        self.chunk_size = chunk_size
+        self.drift_interval = drift_interval
+        self.burst_interval = burst_interval
+        self.burst_length = burst_length
+        self.burst_share = burst_share
+        self._zipf_cdf = None
+
+    def _bounded_zipf(self, rng, n):
+        """
+        Draw `n` Zipf ranks in 1..vocabulary_size by inverting the cumulative distribution.
+        """
+        if self._zipf_cdf is None:
+            weights = np.arange(1, self.vocabulary_size + 1, dtype=np.float64) ** -self.zipf_param
+            self._zipf_cdf = np.cumsum(weights) / weights.sum()
+        ranks = np.searchsorted(self._zipf_cdf, rng.random(n), side="right") + 1
+        return np.minimum(ranks, self.vocabulary_size)
+
+    def _generate(self, rng, start, n):
+        """
+        Return the `n` items of the stream that follow the first `start` ones.
+        """
+        if self.distribution == "uniform":
+            return rng.integers(1, self.vocabulary_size + 1, size=n, dtype=np.int64)
+        if self.distribution == "zipf" and self.vocabulary_size is None:
+            return rng.zipf(a=self.zipf_param, size=n).astype(np.int64)
+
+        items = self._bounded_zipf(rng, n)
+        positions = np.arange(start, start + n, dtype=np.int64)
+        if self.distribution == "drifting_zipf":
+            items = (items - 1 + positions // self.drift_interval) % self.vocabulary_size + 1
+        elif self.distribution == "bursty":
+            burst, offset = np.divmod(positions, self.burst_interval)
+            in_burst = (offset < self.burst_length) & (rng.random(n) < self.burst_share)
+            items = np.where(in_burst, self.vocabulary_size + 1 + burst, items)  # burst k has its own item
+        return items
 
-    def simulate_stream(self):
+    def _read_blocks(self):
         """
-        Simulate a real-time data stream by yielding one item at a time.
-        Yields:
-            One item at a time from the generated stream.
+        Generate the stream chunk by chunk from a generator seeded with `seed`.
         """
-        data_stream = np.random.zipf(a=self.zipf_param, size=self.stream_size).tolist()
-        for item in data_stream:
-            yield item
-            time.sleep(self.sleep_time)
+        rng = np.random.default_rng(self.seed)
+        start = 0
+        while self.stream_size is None or start < self.stream_size:
+            n = self.chunk_size if self.stream_size is None else min(self.chunk_size, self.stream_size - start)
+            yield self._generate(rng, start, n)
+            start += n
@@ -1,23 +1,219 @@
 import abc
+import queue
+import threading
+import time
+import numpy as np
+
+_DONE = object()
+
+
+def _join(pending, block):
+    """
+    Append `block` to the items still pending, keeping numpy arrays as arrays.
+    """
+    if not len(pending):
+        return block
+    if isinstance(block, np.ndarray):
+        return np.concatenate((pending, block))
+    return pending + block
+
+
+def prefetch_blocks(blocks, max_pending=4):
+    """
+    Iterate over `blocks` in a background thread that stays at most `max_pending` blocks ahead, so
+    reading (e.g. decompressing, which releases the GIL) overlaps with the consumer's work.
+    Errors of the reader are raised in the consumer. Closing the returned generator stops the reader.
+    """
+    pending = queue.Queue(max_pending)
+    stop = threading.Event()
+
+    def put(entry):
+        while not stop.is_set():
+            try:
+                pending.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def read():
+        try:
+            for block in blocks:
+                if not put((block, None)):
+                    return
+            put((_DONE, None))
+        except Exception as error:
+            put((_DONE, error))
+        finally:
+            if hasattr(blocks, "close"):
+                blocks.close()
+
+    threading.Thread(target=read, daemon=True).start()
+    try:
+        while True:
+            block, error = pending.get()
+            if block is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield block
+    finally:
+        stop.set()
+
+
+class Pacer:
+    """
+    Token-bucket pacing of a stream at `rate` items per second; a rate of None or 0 means as fast as possible.
+
+    Items are released against an absolute schedule (the k-th item is due k / rate seconds after the
+    start), so a late wake-up is made up by the next releases instead of accumulating as drift, and the
+    actual rate does not depend on the timer granularity. The bucket holds at most `burst` items (one
+    second of items by default): after a longer stall, the stream catches up by at most that many
+    items instead of flooding the consumer.
+
+    `wait_until` paces by recorded timestamps instead, replayed `speedup` times faster than recorded.
+    """
+    def __init__(self, rate=None, burst=None, speedup=1.0, clock=time.perf_counter, sleep=time.sleep):
+        self.rate = rate if rate else None
+        self.burst = burst if burst is not None else (self.rate or 0)
+        self.speedup = speedup
+        self.clock = clock
+        self.sleep = sleep
+        self.reset()
+
+    def reset(self):
+        """
+        Restart the schedule, for a new pass over the stream.
+        """
+        self.items = 0
+        self.started = None
+        self._due = None  # schedule time of the last released item
+        self._first_timestamp = None
+
+    def start(self, first_timestamp=None):
+        """
+        Start the schedule now, unless it is already running. For a replay, `first_timestamp` is the
+        recorded time that corresponds to the start (by default, the first one passed to `wait_until`).
+        """
+        if self.started is None:
+            self.started = self._due = self.clock()
+        if self._first_timestamp is None:
+            self._first_timestamp = first_timestamp
+
+    def _sleep_until(self, due):
+        delay = due - self.clock()
+        if delay > 0:
+            self.sleep(delay)
+
+    def wait(self, n):
+        """
+        Wait until `n` more items may be released at the target rate.
+        """
+        self.start()
+        if self.rate is not None:
+            self._due = max(self._due, self.clock() - self.burst / self.rate) + n / self.rate
+            self._sleep_until(self._due)
+        self.items += n
+
+    def wait_until(self, timestamp, n=1):
+        """
+        Wait until the replay reaches `timestamp` (in seconds), then release `n` items.
+        """
+        self.start(timestamp)
+        self._sleep_until(self.started + (timestamp - self._first_timestamp) / self.speedup)
+        self.items += n
+
+    def stats(self):
+        """
+        Return the target rate (None when not rate-paced) and the rate achieved so far, in items per second.
+        """
+        elapsed = self.clock() - self.started if self.started is not None else 0
+        return {"target_rate": self.rate, "achieved_rate": self.items / elapsed if elapsed > 0 else 0.0}
 
 
 class StreamSimulator(abc.ABC):
     """
     Abstract base class for simulating data streams.
     """
-    def __init__(self, sleep_time=0.01):
+    def __init__(self, sleep_time=0.01, rate=None, speedup=1.0):
         """
         Initialize the stream simulator.
 
         Args:
-            sleep_time: Time delay between yielding each item.
+            sleep_time: Time delay between yielding each item; only used when `rate` is not given.
+            rate: Target rate in items per second; 0 streams as fast as possible.
+            speedup: Replay speed factor of streams with recorded timestamps.
         """
         self.sleep_time = sleep_time
+        if rate is None:
+            rate = 1 / sleep_time if sleep_time else 0
+        self.pacer = Pacer(rate, speedup=speedup)
 
     @abc.abstractmethod
-    def simulate_stream(self):
+    def _read_blocks(self):
         """
-        Abstract method to simulate a real-time data stream.
-        Should yield one item at a time.
+        Abstract method reading the stream source, without any delay.
+        Should yield the items of the stream in lists or numpy arrays of any length.
         """
         pass
+
+    def _read_timed_blocks(self):
+        """
+        Yield (block, timestamps) pairs, where `timestamps` holds the recorded time of every item
+        of the block, or is None when the source has no timestamps.
+        """
+        for block in self._read_blocks():
+            yield block, None
+
+    def _release(self, n, timestamp=None):
+        """
+        Wait for the simulated arrival of `n` items, the last of which was recorded at `timestamp` if known.
+        """
+        if timestamp is None:
+            self.pacer.wait(n)
+        else:
+            self.pacer.wait_until(timestamp, n)
+
+    def simulate_stream(self):
+        """
+        Simulate a real-time data stream by yielding one item at a time.
+        """
+        self.pacer.reset()
+        for block, timestamps in self._read_timed_blocks():
+            for i, item in enumerate(block):
+                self._release(1, None if timestamps is None else timestamps[i])
+                yield item
+
+    def simulate_batches(self, batch_size, skip=0):
+        """
+        Simulate the stream in batches of `batch_size` items (the last one may be shorter), for the batch
+        APIs of the sketches. Batches are lists, or numpy arrays when the source reads arrays.
+        Pacing is applied once per batch, for all of its items.
+
+        Args:
+            batch_size: Number of items per batch.
+            skip: Number of items to skip first, without delay (e.g. when resuming from a checkpoint).
+        """
+        self.pacer.reset()
+        pending, pending_timestamps = [], []
+        for block, timestamps in self._read_timed_blocks():
+            if skip:
+                skipped = min(skip, len(block))
+                block = block[skipped:]
+                timestamps = None if timestamps is None else timestamps[skipped:]
+                skip -= skipped
+            pending = _join(pending, block)
+            if timestamps is not None:
+                pending_timestamps = _join(pending_timestamps, timestamps)
+                if len(pending_timestamps):
+                    self.pacer.start(pending_timestamps[0])  # the replay starts with the first item
+            full = len(pending) - len(pending) % batch_size
+            for start in range(0, full, batch_size):
+                end = start + batch_size
+                self._release(batch_size, pending_timestamps[end - 1] if len(pending_timestamps) else None)
+                yield pending[start:end]
+            pending = pending[full:]
+            pending_timestamps = pending_timestamps[full:]
+        if len(pending):
+            self._release(len(pending), pending_timestamps[-1] if len(pending_timestamps) else None)
+            yield pending
@@ -0,0 +1,102 @@
+"""
+checkpoint.py
+
+Checkpoint/resume support for long simulations.
+
+A checkpoint directory holds two slots. Each slot has one memory-mapped `.npy` file per state array of
+the sketch (see `STATE_ARRAYS`) and a pickle of the ground truth. A small JSON header records which
+slot is current, together with the shape, hash family and scalar state of the sketch, the stream
+position and the size of the results log. A checkpoint writes the slot that is not current
+and only then replaces the header, so a process killed at any point leaves the last checkpoint intact.
+"""
+import json
+import os
+import pickle
+from numpy.lib.format import open_memmap
+
+HEADER_FILE = "checkpoint.json"
+
+
+class Checkpoint:
+    def __init__(self, directory):
+        self.directory = directory
+        self.header_path = os.path.join(directory, HEADER_FILE)
+        self.slot = None
+        self._maps = {}
+
+    def exists(self):
+        return os.path.exists(self.header_path)
+
+    def _sketch_header(self, cms):
+        return {
+            "algorithm": type(cms).__name__,
+            "width": cms.width,
+            "depth": cms.depth,
+            "hash_family": repr(cms.hash_family),
+            "arrays": {field: [str(getattr(cms, field).dtype), list(getattr(cms, field).shape)]
+                       for field in cms.STATE_ARRAYS},
+        }
+
+    def _path(self, name, slot):
+        return os.path.join(self.directory, f"{name}.{slot}")
+
+    def _array_map(self, field, slot, array):
+        """
+        Return the memory map of `field` in `slot`, creating the file on first use.
+        """
+        path = self._path(field, slot) + ".npy"
+        if path not in self._maps:
+            self._maps[path] = open_memmap(path, mode="w+", dtype=array.dtype, shape=array.shape)
+        return self._maps[path]
+
+    def save(self, cms, ground_truth, stream_position, results_size):
+        """
+        Write the state of the sketch and the ground truth into the free slot, then make it current.
+        """
+        slot = 0 if self.slot != 0 else 1
+        for field in cms.STATE_ARRAYS:
+            array = getattr(cms, field)
+            array_map = self._array_map(field, slot, array)
+            array_map[...] = array
+            array_map.flush()
+        with open(self._path("ground_truth", slot) + ".pkl", "wb") as f:
+            pickle.dump(ground_truth, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        header = self._sketch_header(cms)
+        header.update({
+            "slot": slot,
+            "scalars": {field: int(getattr(cms, field)) for field in cms.STATE_SCALARS},
+            "stream_position": stream_position,
+            "results_size": results_size,
+        })
+        tmp_path = self.header_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(header, f, indent=4)
+        os.replace(tmp_path, self.header_path)
+        self.slot = slot
+
+    def load(self, cms):
+        """
+        Restore the sketch from the current slot, in place.
+        The sketch must have been built with the same parameters as the checkpointed one.
+
+        Returns:
+            The ground truth, the stream position and the size in bytes of the results log.
+        """
+        with open(self.header_path, "r") as f:
+            header = json.load(f)
+        expected = self._sketch_header(cms)
+        for key, value in expected.items():
+            if header[key] != value:
+                raise ValueError(f"Checkpoint {key} {header[key]} does not match the sketch ({value}).")
+
+        slot = header["slot"]
+        for field in cms.STATE_ARRAYS:
+            getattr(cms, field)[...] = open_memmap(self._path(field, slot) + ".npy", mode="r")
+        for field, value in header["scalars"].items():
+            setattr(cms, field, value)
+        with open(self._path("ground_truth", slot) + ".pkl", "rb") as f:
+            ground_truth = pickle.load(f)
+        self.slot = slot
+        return ground_truth, header["stream_position"], header["results_size"]
+
@@ -0,0 +1,118 @@
+"""
+results_log.py
+
+Append-only results log in JSON Lines format: one JSON record per line.
+
+The simulation appends one record per evaluation with a single write, so the log never has to be
+rewritten. Readers only parse complete lines: a record that is still being written is picked up by
+the next read. `ResultsReader` keeps its file offset to read only what was appended since its last
+call, starting over when the log is truncated or replaced, and `convert_to_json` writes the legacy
+results.json at the end of a run.
+"""
+import json
+import os
+
+
+def append_result(log_path, result):
+    """
+    Append one record to the log.
+
+    Returns:
+        The size of the log in bytes after the append, usable to truncate back to this record.
+    """
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(result) + "\n")
+        return f.tell()
+
+
+def truncate_results(log_path, size):
+    """
+    Drop the records appended after the log had `size` bytes.
+    """
+    with open(log_path, "r+b") as f:
+        f.truncate(size)
+
+
+def read_results_from(log_path, offset=0):
+    """
+    Read the complete records appended after byte `offset`.
+    Starts over from the beginning if the log is now shorter than `offset` (it was truncated), or if
+    `offset` no longer falls on a record boundary (it was rewritten in place).
+
+    Returns:
+        The new records and the offset to pass to the next call.
+    """
+    reader = ResultsReader(log_path)
+    reader.offset = offset
+    return reader.read_new(), reader.offset
+
+
+class ResultsReader:
+    """
+    Incremental reader of a results log. `records` holds every complete record read so far.
+
+    The log is identified by its inode and its first record, so a log replaced or rewritten
+    since the last call, even by a longer one, is read again from the start.
+    """
+    def __init__(self, log_path):
+        self.log_path = log_path
+        self.offset = 0
+        self.identity = None
+        self.records = []
+
+    def restart(self):
+        """
+        Forget what was read, the next read starts from the beginning of the log.
+        """
+        self.offset = 0
+        self.identity = None
+        self.records = []
+
+    def read_new(self):
+        """
+        Read the records appended since the last call and return them.
+        Starts over if the log was truncated, replaced or rewritten.
+        """
+        if not os.path.exists(self.log_path):
+            self.restart()
+            return []
+        with open(self.log_path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            first_line = f.readline()
+            identity = (stat.st_ino, first_line) if first_line.endswith(b"\n") else None
+            if stat.st_size < self.offset or (self.identity is not None and identity != self.identity):
+                self.restart()
+            f.seek(self.offset)
+            data = f.read()
+        complete = data[:data.rfind(b"\n") + 1]
+        try:
+            new_records = [json.loads(line) for line in complete.splitlines() if line.strip()]
+        except ValueError:
+            if not self.offset:
+                raise
+            # The offset fell inside a record of a log rewritten under the same identity
+            self.restart()
+            return self.read_new()
+        self.offset += len(complete)
+        self.identity = identity
+        self.records.extend(new_records)
+        return new_records
+
+
+def load_results(log_path):
+    """
+    Return every complete record of the log.
+    """
+    reader = ResultsReader(log_path)
+    reader.read_new()
+    return reader.records
+
+
+def convert_to_json(log_path, json_path):
+    """
+    Write the records of the log as the legacy results.json (a JSON list), atomically.
+    """
+    tmp_path = json_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(load_results(log_path), f, indent=4)
+    os.replace(tmp_path, json_path)
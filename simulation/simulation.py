@@ -1,26 +1,38 @@
 import json
 import os
 import datetime
+import time
 from evaluation.memory_usage import evaluate_memory_usage
 from evaluation.avg_query_time import evaluate_avg_query_time
 from evaluation.accuracy import evaluate_accuracy
 from ground_truth.decaying_truth import DecayingTruth
 from ground_truth.truth import Truth
-from visualization.visualization import visualize
-import copy
+from visualization.downsampling import DEFAULT_MAX_POINTS
+from visualization.plot_worker import PlotWorker, request_plots
+from persistence.checkpoint import Checkpoint
+from persistence.results_log import append_result, convert_to_json, truncate_results
 import argparse
+import multiprocessing
+import queue
+import numpy as np
 
+MERGEABLE_ALGORITHMS = ("CountMinSketch", "ConservativeCountMinSketch", "CountMeanMinSketch", "CountSketch")
+BACKPRESSURE_POLICIES = ("block", "drop")
+PARENT_CHECK_INTERVAL = 1.0  # seconds a child process waits for a request before checking on its parent
 
-def evaluate(cms, ground_truth):
-    accuracy = evaluate_accuracy(cms, ground_truth)
-    avg_query_time = evaluate_avg_query_time(cms, ground_truth)
+
+def evaluate(cms, ground_truth, accuracy_options=None):
+    accuracy = evaluate_accuracy(cms, ground_truth, **(accuracy_options or {}))
+    # In sampling mode, time the queries of the sampled keys rather than of every key
+    avg_query_time = evaluate_avg_query_time(cms, ground_truth, test_items=accuracy.get("sampled_items"))
     memory_usage = evaluate_memory_usage(cms)
     load_factor = cms.get_load_factor()
 
     return accuracy, avg_query_time, memory_usage, load_factor
 
 
-def record_metrics(results_file, items_processed, accuracy, avg_query_time, memory_usage, load_factor):
+def record_metrics(results_file, items_processed, accuracy, avg_query_time, memory_usage, load_factor,
+                   snapshot_time, stream_rates=None):
     result = {
         "processed_items": int(items_processed),
         "avg_error": float(accuracy["avg_error"]),
@@ -31,6 +43,7 @@ def record_metrics(results_file, items_processed, accuracy, avg_query_time, memo
         "avg_query_time": float(avg_query_time),
         "memory_usage": float(memory_usage),
         "load_factor": float(load_factor),
+        "snapshot_time": float(snapshot_time),
         "percentiles": {
             "overestimation": {
                 "50th": float(accuracy.get("overestimation_percentiles", {}).get("50th", 0.0)),
@@ -52,111 +65,446 @@ def record_metrics(results_file, items_processed, accuracy, avg_query_time, memo
             }
         }
     }
-    try:
-        with open(results_file, "r") as f:
-            existing_results = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        existing_results = []
-    existing_results.append(result)
-    with open(results_file, "w") as f:
-        json.dump(existing_results, f, indent=4)
+    if "confidence_intervals" in accuracy:
+        result["sample_size"] = int(accuracy["sample_size"])
+        result["confidence_intervals"] = accuracy["confidence_intervals"]
+    if stream_rates is not None:
+        result.update(stream_rates)
+    return append_result(results_file, result)
 
 
-def get_algorithm(algorithm, width, depth):
+def get_algorithm(algorithm, width, depth, hash_family=None, counter_dtype=None):
     if algorithm == "CountMinSketch":
         from summarization_algorithms.count_min_sketch import CountMinSketch
-        cms = CountMinSketch(width=width, depth=depth)
+        cms = CountMinSketch(width=width, depth=depth, hash_family=hash_family, counter_dtype=counter_dtype)
     elif algorithm == "ConservativeCountMinSketch":
         from summarization_algorithms.conservative_count_min_sketch import ConservativeCountMinSketch
-        cms = ConservativeCountMinSketch(width=width, depth=depth)
+        cms = ConservativeCountMinSketch(width=width, depth=depth, hash_family=hash_family,
+                                         counter_dtype=counter_dtype)
     elif algorithm == "CountMeanMinSketch":
         from summarization_algorithms.count_mean_min_sketch import CountMeanMinSketch
-        cms = CountMeanMinSketch(width=width, depth=depth)
+        cms = CountMeanMinSketch(width=width, depth=depth, hash_family=hash_family, counter_dtype=counter_dtype)
     elif algorithm == "CountSketch":
         from summarization_algorithms.count_sketch import CountSketch
-        cms = CountSketch(width=width, depth=depth)
+        cms = CountSketch(width=width, depth=depth, hash_family=hash_family, counter_dtype=counter_dtype)
     elif algorithm == "SlidingCountMinSketch":
         from summarization_algorithms.sliding_count_min_sketch import SlidingCountMinSketch
-        cms = SlidingCountMinSketch(width=width, depth=depth)
+        cms = SlidingCountMinSketch(width=width, depth=depth, hash_family=hash_family, counter_dtype=counter_dtype)
+    elif algorithm == "CompactExpCountMinSketch":
+        from summarization_algorithms.compact_exp_count_min_sketch import CompactExpCountMinSketch
+        cms = CompactExpCountMinSketch(width=width, depth=depth, window_size=width*depth, counter_size=32,
+                                       hash_family=hash_family)
     else:
         raise ValueError(f"Unknown algorithm: {algorithm}")
     return cms
 
 
 def get_truth_class(config):
-    if config["algorithm"] == "SlidingCountMinSketch":
-        return DecayingTruth(window_size=config["width"]*config["depth"])
-    return Truth()
+    heavy_threshold = config.get("heavy_hitter_threshold")
+    if config["algorithm"] in ("SlidingCountMinSketch", "CompactExpCountMinSketch"):
+        return DecayingTruth(window_size=config["width"]*config["depth"], heavy_threshold=heavy_threshold)
+    return Truth(heavy_threshold=heavy_threshold)
+
+
+def get_accuracy_options(config):
+    """
+    Return the keyword arguments of `evaluate_accuracy`: sampled evaluation when
+    `accuracy_sample_size` is set, every key otherwise.
+    """
+    if config.get("accuracy_sample_size") is None:
+        return {}
+    return {
+        "sample_size": config["accuracy_sample_size"],
+        "heavy_threshold": config.get("heavy_hitter_threshold"),
+        "confidence": config.get("confidence", 0.95),
+    }
 
 
 def get_stream_simulator(config):
 
     if config["dataset_name"] == "synthetic":
         from input_stream.random_stream_simulator import RandomStreamSimulator
-        return RandomStreamSimulator(sleep_time=config["sleep_time"])
+        return RandomStreamSimulator(
+            sleep_time=config.get("sleep_time", 0),
+            rate=config.get("rate"),
+            stream_size=config.get("stream_size", 500000),
+            zipf_param=config.get("zipf_param", 1.3),
+            seed=config.get("seed"),
+            distribution=config.get("distribution", "zipf"),
+            vocabulary_size=config.get("vocabulary_size")
+        )
     else:
         from input_stream.dataset_stream_simulator import DatasetStreamSimulator
         return DatasetStreamSimulator(
             dataset_path=f"../datasets/{config['dataset_name']}",
             field_name=config["field"],
-            sleep_time=config["sleep_time"]
+            sleep_time=config.get("sleep_time", 0),
+            rate=config.get("rate"),
+            timestamp_field=config.get("timestamp_field"),
+            speedup=config.get("replay_speedup", 1.0),
+            numeric=config.get("numeric_tokens", False),
+            use_cache=config.get("use_dataset_cache", False)
         )
 
 
-def eval_and_record(cms, ground_truth, file_path):
-    accuracy, query_speed, memory_usage, load_factor = evaluate(copy.deepcopy(cms), ground_truth.get_all())
-    record_metrics(file_path, cms.totalCount, accuracy, query_speed, memory_usage, load_factor)
+def eval_and_record(cms, ground_truth, file_path, snapshot_time, checkpoint=None, accuracy_options=None,
+                    stream_rates=None):
+    """
+    Evaluate `cms`, a frozen snapshot of the sketch that took `snapshot_time` seconds on the ingestion
+    path, against a snapshot view of the ground truth (O(1), see `BaseTruth.snapshot`). Append the
+    metrics (and the target and achieved stream rates, if given) to `file_path` and, if given, save a checkpoint.
+    """
+    accuracy, query_speed, memory_usage, load_factor = evaluate(cms, ground_truth.snapshot(), accuracy_options)
+    results_size = record_metrics(file_path, cms.totalCount, accuracy, query_speed, memory_usage, load_factor,
+                                  snapshot_time, stream_rates)
+    if checkpoint is not None:
+        checkpoint.save(cms, ground_truth, cms.totalCount, results_size)
 
 
-if __name__ == '__main__':
-    with open("../config.json", "r") as f:
-        CONFIG = json.load(f)
+def receive(requests):
+    """
+    Yield the requests sent to a child process until the None sentinel. Also stops once the parent
+    process is gone: when the simulation is killed (e.g. by the dashboard's Stop button), the
+    sentinel never comes and the child would otherwise wait forever.
+    """
+    parent = multiprocessing.parent_process()
+    while True:
+        try:
+            request = requests.get(timeout=PARENT_CHECK_INTERVAL)
+        except queue.Empty:
+            if parent is not None and not parent.is_alive():
+                return
+            continue
+        if request is None:
+            return
+        yield request
+
+
+def put_to_child(requests, request, process):
+    """
+    Put `request` on the queue of the child `process`, waiting while the queue is full,
+    unless the child has died and will never take it.
+    """
+    while True:
+        try:
+            requests.put(request, timeout=PARENT_CHECK_INTERVAL)
+            return
+        except queue.Full:
+            if not process.is_alive():
+                raise RuntimeError(f"{process.name} exited with code {process.exitcode}")
+
+
+def run_evaluator(requests, ground_truth, results_file, plot_requests, checkpoint, vis_interval, accuracy_options,
+                  checkpoint_interval=None):
+    """
+    Body of the evaluator process: apply the items of every request to the ground truth, then evaluate
+    the sketch snapshot of the request as it is, in arrival order, until the None sentinel.
+    A checkpoint is saved with the first evaluation after every `checkpoint_interval` items (after every
+    evaluation if None) and with the final one: saving pickles the whole ground truth, so it costs O(keys).
+    Every `vis_interval` items, ask the plot worker listening on `plot_requests` (None without plots) for a render;
+    the final render is requested by `PlotWorker.close` once the evaluator is done.
+    """
+    last_visualized = last_checkpoint = 0
+    for batches, cms, snapshot_time, stream_rates, final in receive(requests):
+        for items in batches:
+            ground_truth.add_many(items)
+        save = (final or not checkpoint_interval
+                or cms.totalCount // checkpoint_interval > last_checkpoint // checkpoint_interval)
+        eval_and_record(cms, ground_truth, results_file, snapshot_time, checkpoint if save else None, accuracy_options,
+                        stream_rates)
+        if save:
+            last_checkpoint = cms.totalCount
+        if not final and cms.totalCount // vis_interval > last_visualized // vis_interval:
+            if plot_requests is not None:
+                request_plots(plot_requests)
+            last_visualized = cms.totalCount
+
+
+class Evaluator:
+    """
+    Evaluation stage running in its own process, off the ingestion path. It owns the ground truth:
+    each request carries the batches ingested since the previous request and a snapshot of the sketch,
+    so sending a request does not depend on the number of distinct keys. Evaluating it still does:
+    the accuracy (unless sampled, see `get_accuracy_options`), the query timing and the checkpoint
+    all grow with the key set.
+
+    At most `max_pending` requests wait in the queue. When it is full, the backpressure policy decides:
+        - "block": wait for the evaluator, so every evaluation is performed. Once an evaluation takes
+          longer than ingesting `eval_interval` items, ingestion slows down to the evaluation pace.
+        - "drop": skip this evaluation; its items are carried over into the next request. Ingestion
+          keeps its pace, and evaluations get sparser as they get slower.
+    The evaluator exits by itself if the simulation process is killed.
+    """
+    def __init__(self, ground_truth, results_file, plot_requests, checkpoint, vis_interval, max_pending=2,
+                 policy="block", accuracy_options=None, pacer=None, checkpoint_interval=None):
+        if policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        self.policy = policy
+        self.pacer = pacer  # the Pacer of the stream, whose rates are recorded with every evaluation
+        self.dropped = 0
+        self.pending_batches = []  # batches ingested since the last request that was sent
+        self.requests = multiprocessing.Queue(max_pending)
+        self.process = multiprocessing.Process(
+            target=run_evaluator,
+            args=(self.requests, ground_truth, results_file, plot_requests, checkpoint, vis_interval, accuracy_options,
+                  checkpoint_interval),
+            daemon=True
+        )
+        self.process.start()
+
+    def submit(self, cms, items, final=False):
+        """
+        Request an evaluation of the current state of `cms`, which has just ingested `items`.
+        The snapshot of the sketch is the only copy made for the evaluation; the time it stalls
+        ingestion is recorded as `snapshot_time`. The final request is never dropped.
+        """
+        self.pending_batches.append(items)
+        stream_rates = self.pacer.stats() if self.pacer is not None else None
+        start_time = time.perf_counter()
+        snapshot = cms.snapshot()
+        snapshot_time = time.perf_counter() - start_time
+        request = (self.pending_batches, snapshot, snapshot_time, stream_rates, final)
+        if self.policy == "block" or final:
+            put_to_child(self.requests, request, self.process)
+        else:
+            try:
+                self.requests.put_nowait(request)
+            except queue.Full:
+                self.dropped += 1
+                return
+        self.pending_batches = []
+
+    def close(self):
+        """
+        Wait until every queued evaluation has been recorded.
+        """
+        put_to_child(self.requests, None, self.process)
+        self.process.join()
+
+
+def run_shard_worker(chunks, deltas, algorithm, width, depth, hash_family, counter_dtype):
+    """
+    Body of a shard worker process: keep one sketch for the whole run, add every chunk of items received
+    on `chunks`, and answer each one on `deltas` with the sparse form of what it added, until the None sentinel.
+    """
+    cms = get_algorithm(algorithm, width, depth, hash_family, counter_dtype)
+    for items in receive(chunks):
+        cms.add_many(items)
+        deltas.put(cms.to_sparse())
+        cms.reset()
+
+
+class ShardWorkers:
+    """
+    Long-lived worker processes, each with its own sketch of the same shape as `cms`.
+    A chunk of items is split into one contiguous shard per worker; each worker sketches its shard and
+    sends back only the counters it touched, which `collect` adds to `cms`. Chunks are pipelined:
+    the next chunk can be dispatched before the deltas of the previous one are collected.
+    """
+    def __init__(self, cms, workers, algorithm, hash_family=None, counter_dtype=None):
+        self.cms = cms
+        self.chunks = [multiprocessing.Queue(2) for _ in range(workers)]
+        self.deltas = [multiprocessing.Queue() for _ in range(workers)]
+        self.processes = [multiprocessing.Process(target=run_shard_worker,
+                                                  args=(chunks, deltas, algorithm, cms.width, cms.depth,
+                                                        hash_family, counter_dtype),
+                                                  daemon=True)
+                          for chunks, deltas in zip(self.chunks, self.deltas)]
+        for process in self.processes:
+            process.start()
+        self.pending = []  # number of shards of every chunk dispatched but not collected yet
 
+    def dispatch(self, items):
+        size = -(-len(items) // len(self.processes))
+        shards = [items[start:start + size] for start in range(0, len(items), size)]
+        for chunks, process, shard in zip(self.chunks, self.processes, shards):
+            put_to_child(chunks, shard, process)
+        self.pending.append(len(shards))
+
+    def collect(self):
+        """
+        Merge the deltas of the oldest dispatched chunk into the sketch.
+        """
+        for deltas, process in zip(self.deltas, self.processes[:self.pending.pop(0)]):
+            while True:
+                try:
+                    self.cms.merge_sparse(deltas.get(timeout=PARENT_CHECK_INTERVAL))
+                    break
+                except queue.Empty:
+                    if not process.is_alive():
+                        raise RuntimeError(f"{process.name} exited with code {process.exitcode}")
+
+    def close(self):
+        for chunks, process in zip(self.chunks, self.processes):
+            put_to_child(chunks, None, process)
+        for process in self.processes:
+            process.join()
+
+
+def concatenate(batches):
+    if isinstance(batches[0], np.ndarray):
+        return np.concatenate(batches)
+    return [item for batch in batches for item in batch]
+
+
+def simulate_sharded(cms, batches, evaluator, workers, algorithm, config):
+    """
+    Ingest `batches` with a pool of `workers` shard workers. Batches are gathered into chunks of
+    `merge_interval` items (`eval_interval` by default), and the deltas of every chunk are merged into
+    `cms` and evaluated once, while the workers already sketch the next chunk: a larger interval
+    lowers the transfer cost per item, at the price of sparser evaluations.
+    Returns the items of the last chunk, merged but not evaluated yet, for the final evaluation.
+    """
+    merge_interval = max(config.get("merge_interval") or config["eval_interval"], config["eval_interval"])
+
+    def chunks():
+        gathered, size = [], 0
+        for batch in batches:
+            gathered.append(batch)
+            size += len(batch)
+            if size >= merge_interval:
+                yield concatenate(gathered)
+                gathered, size = [], 0
+        if size:
+            yield concatenate(gathered)
+
+    shard_workers = ShardWorkers(cms, workers, algorithm, config.get("hash_family"), config.get("counter_dtype"))
+    previous = []
+    try:
+        for chunk in chunks():
+            shard_workers.dispatch(chunk)
+            if len(previous):
+                shard_workers.collect()
+                evaluator.submit(cms, previous)
+            previous = chunk
+        if len(previous):
+            shard_workers.collect()
+    finally:
+        shard_workers.close()
+    return previous
+
+
+def build_parser():
+    """
+    Return the parser of the command line, whose options override the settings of config.json.
+    """
     parser = argparse.ArgumentParser()
     parser.add_argument('--algorithm', required=True, help='Algorithm to use')
     parser.add_argument('--dataset', required=True, help='Dataset to use')
     parser.add_argument('--width', type=int, help='Width parameter for CMS')
     parser.add_argument('--depth', type=int, help='Depth parameter for CMS')
+    parser.add_argument('--hash-family', help='Hash family used by the sketch (sha256, double, seeded, multiply_shift)')
+    parser.add_argument('--counter-dtype', help='Counter dtype of the sketch (uint8, uint16, uint32, int32, int64)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of worker processes keeping per-shard sketches merged into the main one '
+                             '(linear sketches only)')
+    parser.add_argument('--merge-interval', type=int,
+                        help='With --workers, number of items sketched by the workers between merges and evaluations')
+    parser.add_argument('--eval-queue', type=int, help='Number of evaluations that may wait for the evaluator')
+    parser.add_argument('--backpressure', choices=BACKPRESSURE_POLICIES,
+                        help='What to do when the evaluation queue is full: block ingestion or drop the evaluation')
+    parser.add_argument('--rate', type=float,
+                        help='Target stream rate in items per second; 0 streams as fast as possible')
     parser.add_argument('--timestamp', required=False)
-    args = parser.parse_args()
+    parser.add_argument('--no-plots', action='store_true',
+                        help='Headless run: do not render the PNG plots (matplotlib is not imported)')
+    parser.add_argument('--checkpoint-interval', type=int,
+                        help='Number of items between checkpoints (a checkpoint costs O(distinct keys))')
+    parser.add_argument('--resume', action='store_true',
+                        help='Resume the run of --timestamp from its last checkpoint')
+    return parser
 
+
+def apply_arguments(config, args):
+    """
+    Write the algorithm, the dataset and the overridden settings of the parsed command line into `config`,
+    so that everything built from the config (e.g. the truth of `get_truth_class`) follows the command line.
+    """
+    config['algorithm'] = args.algorithm
+    config['dataset_name'] = args.dataset
     if args.width is not None:
-        CONFIG['width'] = args.width
+        config['width'] = args.width
     if args.depth is not None:
-        CONFIG['depth'] = args.depth
+        config['depth'] = args.depth
+    if args.hash_family is not None:
+        config['hash_family'] = args.hash_family
+    if args.counter_dtype is not None:
+        config['counter_dtype'] = args.counter_dtype
+    if args.merge_interval is not None:
+        config['merge_interval'] = args.merge_interval
+    if args.eval_queue is not None:
+        config['eval_queue'] = args.eval_queue
+    if args.backpressure is not None:
+        config['backpressure'] = args.backpressure
+    if args.rate is not None:
+        config['rate'] = args.rate
+    if args.checkpoint_interval is not None:
+        config['checkpoint_interval'] = args.checkpoint_interval
+    return config
+
+
+if __name__ == '__main__':
+    with open("../config.json", "r") as f:
+        CONFIG = json.load(f)
+
+    parser = build_parser()
+    args = parser.parse_args()
+    if args.resume and not args.timestamp:
+        parser.error("--resume needs the --timestamp of the run to resume")
+    if args.workers > 1 and args.algorithm not in MERGEABLE_ALGORITHMS:
+        parser.error(f"--workers needs a mergeable algorithm: {', '.join(MERGEABLE_ALGORITHMS)}")
+
+    apply_arguments(CONFIG, args)
 
     WIDTH = CONFIG["width"]
     DEPTH = CONFIG["depth"]
-    ALGORITHM = args.algorithm
+    ALGORITHM = CONFIG["algorithm"]
     EVAL_INTERVAL = CONFIG["eval_interval"]
     VIS_INTERVAL = CONFIG["vis_interval"]
-    if args.dataset:
-        CONFIG['dataset_name'] = args.dataset
     DATASET_NAME = CONFIG["dataset_name"]
 
     stream_simulator = get_stream_simulator(CONFIG)
-    cms = get_algorithm(ALGORITHM, WIDTH, DEPTH)
+    cms = get_algorithm(ALGORITHM, WIDTH, DEPTH, CONFIG.get("hash_family"), CONFIG.get("counter_dtype"))
     ground_truth = get_truth_class(CONFIG)
 
     timestamp = args.timestamp or datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     RESULTS_DIR = f"../experiments/{DATASET_NAME}/{ALGORITHM}/w{cms.width}_d{cms.depth}/{timestamp}"
     os.makedirs(RESULTS_DIR, exist_ok=True)
-    RESULTS_FILE = os.path.join(RESULTS_DIR, "results.json")
+    RESULTS_FILE = os.path.join(RESULTS_DIR, "results.jsonl")
     PLOTS_DIR = RESULTS_DIR
 
     if not os.path.exists(RESULTS_FILE):
-        with open(RESULTS_FILE, "w") as f:
-            json.dump([], f)
+        open(RESULTS_FILE, "w").close()
 
-    for item in stream_simulator.simulate_stream():
-        cms.add(item)
-        ground_truth.add(item)
+    checkpoint = Checkpoint(RESULTS_DIR)
+    stream_position = 0
+    if args.resume:
+        if not checkpoint.exists():
+            parser.error(f"No checkpoint found in {RESULTS_DIR}")
+        ground_truth, stream_position, results_size = checkpoint.load(cms)
+        truncate_results(RESULTS_FILE, results_size)
+    batches = stream_simulator.simulate_batches(EVAL_INTERVAL, skip=stream_position)
 
-        if cms.totalCount % EVAL_INTERVAL == 0:
-            eval_and_record(cms, ground_truth, RESULTS_FILE)
-
-        if cms.totalCount % VIS_INTERVAL == 0:
-            visualize(RESULTS_FILE, PLOTS_DIR)
+    plot_worker = None
+    if not args.no_plots:
+        plot_worker = PlotWorker(RESULTS_FILE, PLOTS_DIR, CONFIG.get("max_points_per_trace", DEFAULT_MAX_POINTS))
+    evaluator = Evaluator(ground_truth, RESULTS_FILE, plot_worker.requests if plot_worker else None, checkpoint,
+                          VIS_INTERVAL, CONFIG.get("eval_queue", 2), CONFIG.get("backpressure", "block"),
+                          get_accuracy_options(CONFIG), stream_simulator.pacer, CONFIG.get("checkpoint_interval"))
+    if args.workers > 1:
+        batch = simulate_sharded(cms, batches, evaluator, args.workers, ALGORITHM, CONFIG)
+    else:
+        batch = []
+        for batch in batches:
+            cms.add_many(batch)
+            if len(batch) == EVAL_INTERVAL:
+                evaluator.submit(cms, batch)
+                batch = []  # only the last batch can be shorter; it goes with the final evaluation
 
-    eval_and_record(cms, ground_truth, RESULTS_FILE)
-    visualize(RESULTS_FILE, PLOTS_DIR)
+    evaluator.submit(cms, batch, final=True)
+    evaluator.close()
+    if plot_worker is not None:
+        plot_worker.close()
+    convert_to_json(RESULTS_FILE, os.path.join(RESULTS_DIR, "results.json"))
+    if evaluator.dropped:
+        print(f"Dropped {evaluator.dropped} evaluations to keep up with the stream")
@@ -0,0 +1,141 @@
+"""
+compact_exp_count_min_sketch.py
+ECM-Sketch (Count-Min Sketch of exponential histograms) with array-backed storage.
+
+Every cell keeps its exponential histogram in preallocated numpy arrays instead of
+`Counter`/`Bucket` objects: bucket exponents, start and end timestamps, oldest bucket first,
+plus the number of buckets per cell. A histogram holds at most two buckets of each size,
+so the capacity per cell only grows with the logarithm of the window. New buckets are
+appended, so an insertion only moves the few small buckets involved in a merge.
+"""
+import math
+import numpy as np
+from summarization_algorithms.count_min_sketch_base import CountMinSketchBase
+
+
+class CompactExpCountMinSketch(CountMinSketchBase):
+    """
+    Sliding-window Count-Min Sketch whose cells are exponential histograms stored in numpy arrays.
+    """
+    STATE_ARRAYS = ("exponent", "start", "end", "length")
+
+    def __init__(self, width, depth, window_size=1, counter_size=4, hash_family=None):
+        """
+        Initialize sketch with width, depth, window size (in arrivals), counter size (bits of the
+        largest reported estimate) and hash family.
+        """
+        super().__init__(width, depth, hash_family)
+        self.window_size = window_size
+        self.counter_size = counter_size
+        self.MAX_CNT = (1 << counter_size) - 1
+        # Two buckets per size, one level per power of two up to the window, one transient extra bucket
+        self.max_buckets = 2 * (math.ceil(math.log2(window_size + 1)) + 2) + 1
+        self.exponent = np.zeros((depth, width, self.max_buckets), dtype=np.int8)
+        self.start = np.zeros((depth, width, self.max_buckets), dtype=np.int64)
+        self.end = np.zeros((depth, width, self.max_buckets), dtype=np.int64)
+        self.length = np.zeros((depth, width), dtype=np.int16)
+        self._slots = np.arange(self.max_buckets)
+
+    def _expire_bucket(self, i, j, t):
+        """
+        Drop the buckets of cell (i, j) whose newest arrival left the window.
+        Ends grow from oldest to newest bucket, so the expired buckets are a prefix.
+        """
+        n = self.length[i, j]
+        end = self.end[i, j]
+        if n == 0 or end[0] > t - self.window_size:
+            return
+        k = int(np.count_nonzero(end[:n] <= t - self.window_size))
+        for field in (self.exponent[i, j], self.start[i, j], end):
+            field[:n - k] = field[k:n]
+        self.length[i, j] = n - k
+
+    def _insert_bucket(self, i, j, t):
+        """
+        Append a bucket of size 1 to cell (i, j). Then, level by level, merge the two oldest
+        buckets of every size that now has three buckets.
+        """
+        exponent, start, end = self.exponent[i, j], self.start[i, j], self.end[i, j]
+        n = int(self.length[i, j])
+        exponent[n], start[n], end[n] = 0, t, t
+        n += 1
+
+        # Exponents shrink towards newer buckets, so the buckets of each size form a run ending at `stop`
+        stop, level = n, 0
+        while stop >= 3 and exponent[stop - 3] == level:
+            oldest = stop - 3
+            exponent[oldest] = level + 1
+            end[oldest] = end[oldest + 1]
+            for field in (exponent, start, end):
+                field[oldest + 1:n - 1] = field[oldest + 2:n]
+            n -= 1
+            stop, level = oldest + 1, level + 1
+        self.length[i, j] = n
+
+    def add(self, item, count=1):
+        """
+        Add item with optional count (must be 1 for this sketch).
+        Uses the number of arrivals so far as the timestamp.
+        """
+        if count != 1:
+            raise NotImplementedError("ECMSketch only supports count=1 per add.")
+        t = self.totalCount
+        for i, j in enumerate(self._hash(item)):
+            self._expire_bucket(i, j, t)
+            self._insert_bucket(i, j, t)
+        self.totalCount += count
+
+    def _bucket_sum(self, i, j):
+        """
+        Return the histogram estimate of cell (i, j): every bucket counts fully except the oldest,
+        which counts for half.
+        """
+        n = self.length[i, j]
+        if n == 0:
+            return 0
+        sizes = 1 << self.exponent[i, j, :n].astype(np.int64)
+        return int(sizes.sum() - sizes[0] + sizes[0] // 2)
+
+    def query(self, item, t=None):
+        if t is None:
+            t = self.totalCount
+        min_val = self.MAX_CNT
+        for i, j in enumerate(self._hash(item)):
+            self._expire_bucket(i, j, t)
+            min_val = min(min_val, self._bucket_sum(i, j))
+        return min_val
+
+    def query_many(self, items, t=None):
+        """
+        Return the window estimate of every element of `items` as a numpy array.
+        Expired buckets are masked out instead of being dropped, so the sketch is left untouched.
+        """
+        if t is None:
+            t = self.totalCount
+        return self._estimates(self._rows(), self._index_matrix(items), t).min(axis=0)
+
+    def _estimates(self, rows, cols, t):
+        """
+        Return the histogram estimate of the cells (rows, cols), capped at MAX_CNT: every live
+        bucket counts fully except the oldest one, which counts for half.
+        """
+        live = (self._slots < self.length[rows, cols][..., None]) & (self.end[rows, cols] > t - self.window_size)
+        sizes = np.where(live, 1 << self.exponent[rows, cols].astype(np.int64), 0)
+        oldest = np.take_along_axis(sizes, live.argmax(axis=-1)[..., None], axis=-1)[..., 0]
+        return np.minimum(sizes.sum(axis=-1) - oldest + oldest // 2, self.MAX_CNT)
+
+    def reset(self):
+        self.length.fill(0)
+        self.totalCount = 0
+
+    def get_load_factor(self):
+        """
+        Return the maximum number of non-empty cells in any row divided by width.
+        """
+        return np.count_nonzero(self.length > 0, axis=1).max() / self.width if self.width else 0
+
+    def get_memory_usage(self):
+        """
+        Return the number of bytes held by the histogram arrays.
+        """
+        return self.exponent.nbytes + self.start.nbytes + self.end.nbytes + self.length.nbytes
@@ -4,28 +4,21 @@ Conservative update Count-Min Sketch implementation.
 """
 from summarization_algorithms.count_min_sketch_base import CountMinSketchBase
 import numpy as np
-import hashlib
+
+MAX_ROUNDS_PER_ROW = 4  # rounds of a batch update, per row of the sketch, before finishing item by item
+MIN_SETTLED_SHARE = 1 / 16  # share of the pending items a round must settle to be worth another round
 
 
 class ConservativeCountMinSketch(CountMinSketchBase):
     """
     Conservative Count-Min Sketch implementation.
     """
-    def __init__(self, width, depth):
-        """
-        Initialize sketch with width and depth.
-        """
-        super().__init__(width, depth)
-        self.counters = np.zeros((self.depth, self.width), dtype=int)
-
-    def _hash(self, x):
+    def __init__(self, width, depth, hash_family=None, counter_dtype=None):
         """
-        Generate multiple hash values for a given input item using SHA-256
+        Initialize sketch with width, depth, hash family and counter dtype.
         """
-        base = str(x)
-        for i in range(self.depth):
-            h = hashlib.sha256((base + str(i)).encode('utf-8'))
-            yield int(h.hexdigest(), 16) % self.width
+        super().__init__(width, depth, hash_family, counter_dtype)
+        self.counters = self._new_counters((self.depth, self.width))
 
     def add(self, item, count=1):
         """
@@ -33,14 +26,91 @@ class ConservativeCountMinSketch(CountMinSketchBase):
         Only increment positions that hold the current minimum estimate.
         """
         indices = list(self._hash(item))
-        current_vals = [self.counters[i][idx] for i, idx in enumerate(indices)]
+        current_vals = [int(self.counters[i][idx]) for i, idx in enumerate(indices)]
         current_min = min(current_vals)
 
         for i, idx in enumerate(indices):
-            self.counters[i][idx] = max(self.counters[i][idx], current_min + count)
+            self.counters[i][idx] = self._saturate(max(current_vals[i], current_min + count))
 
         self.totalCount += count
 
+    def add_many(self, items, counts=None):
+        """
+        Add every element of `items` with conservative update, producing exactly the
+        counters of calling `add` on each item in order.
+
+        Conservative update is order dependent only between items that share a counter,
+        so the batch is applied in rounds. In each round, every pending item whose counters
+        are touched by no earlier pending item of a different key is applied at once:
+        repeated occurrences of such a key are pre-aggregated into a single update
+        (equivalent to applying them back to back), and distinct keys applied in the
+        same round never share a counter. The earliest pending item always qualifies,
+        so the loop terminates; on skewed streams over a wide sketch it needs only a handful of rounds.
+        On a narrow sketch, most keys collide and every round settles only a few items, so after
+        MAX_ROUNDS_PER_ROW * depth rounds, or a round settling less than MIN_SETTLED_SHARE of the
+        pending items, the rest of the batch is applied item by item, in order.
+        """
+        indices = self._index_matrix(items)
+        counts = self._as_counts(counts, indices.shape[1])
+        self.totalCount += int(counts.sum())
+        if not indices.shape[1]:
+            return
+
+        flat_counters = self.counters.reshape(-1)
+        flat = indices + (np.arange(self.depth) * self.width)[:, None]
+        # Compact the touched counters to 0..n_cells-1
+        cells, cell_ids = np.unique(flat, return_inverse=True)
+        cell_ids = cell_ids.reshape(flat.shape)
+        if isinstance(items, np.ndarray) and items.dtype.kind in 'iub':
+            _, key_columns, keys = np.unique(items, return_index=True, return_inverse=True)
+        else:
+            # Items hashing to the same counters behave identically, so distinct columns act as keys
+            keys = cell_ids[0]
+            for row in cell_ids[1:]:
+                _, key_columns, keys = np.unique(keys * cells.size + row, return_index=True, return_inverse=True)
+            if self.depth == 1:
+                _, key_columns, keys = np.unique(keys, return_index=True, return_inverse=True)
+        keys = keys.ravel()
+        key_cells = flat[:, key_columns]
+
+        pending = np.arange(flat.shape[1])
+        for _ in range(MAX_ROUNDS_PER_ROW * self.depth):
+            if not pending.size:
+                return
+            pending_cells = cell_ids[:, pending]
+            position = np.broadcast_to(np.arange(pending.size), pending_cells.shape)
+            pending_keys = keys[pending]
+
+            # Earliest pending item in each cell, and earliest pending item of another key
+            head = np.full(cells.size, pending.size)
+            np.minimum.at(head, pending_cells, position)
+            other = pending_keys[None, :] != pending_keys[np.minimum(head, pending.size - 1)][pending_cells]
+            blocker = np.full(cells.size, pending.size)
+            np.minimum.at(blocker, pending_cells[other], position[other])
+
+            ready = ~other.any(axis=0) & (position < blocker[pending_cells]).all(axis=0)
+            key_counts = np.zeros(len(key_columns), dtype=np.int64)
+            np.add.at(key_counts, pending_keys[ready], counts[pending[ready]])
+            applied = np.zeros(len(key_columns), dtype=bool)
+            applied[pending_keys[ready]] = True
+
+            group_cells = key_cells[:, applied]
+            current = flat_counters[group_cells].astype(np.int64)
+            updated = np.maximum(current, current.min(axis=0) + key_counts[applied])
+            flat_counters[group_cells] = np.clip(updated, self.counter_min, self.counter_max)
+            pending = pending[~ready]
+            if ready.sum() < MIN_SETTLED_SHARE * ready.size:
+                break
+
+        # The touched counters as Python integers, indexed by cell id
+        values = flat_counters[cells].tolist()
+        for column, count in zip(cell_ids[:, pending].T.tolist(), counts[pending].tolist()):
+            target = self._saturate(min(values[cell] for cell in column) + count)
+            for cell in column:
+                if values[cell] < target:
+                    values[cell] = target
+        flat_counters[cells] = values
+
     def query(self, item):
         """
         Return an estimation of the amount of times `item` has ocurred.
@@ -48,6 +118,28 @@ class ConservativeCountMinSketch(CountMinSketchBase):
         """
         return min(table[i] for table, i in zip(self.counters, self._hash(item)))
 
+    def query_many(self, items):
+        """
+        Return a numpy array with the estimation for every element of `items`.
+        """
+        indices = self._index_matrix(items)
+        return self.counters[self._rows(), indices].min(axis=0)
+
+    def merge(self, other):
+        """
+        Approximate merge: add the counters of `other` to ours.
+        Conservative update is not linear, so the result differs from the sketch of the concatenated
+        streams. It still never underestimates, and no counter exceeds the regular Count-Min sketch
+        of both streams.
+        """
+        self._merge_counters(other)
+
+    def merge_sparse(self, sparse):
+        """
+        Approximate merge of a sketch in sparse form, see `merge`.
+        """
+        self._merge_sparse_counters(sparse)
+
     def reset(self):
         """
         Reset the sketch by clearing all tables and setting the count to 0.
@@ -4,46 +4,49 @@ Count-Mean-Min Sketch implementation.
 """
 from summarization_algorithms.count_min_sketch_base import CountMinSketchBase
 import numpy as np
-import hashlib
 
 
 class CountMeanMinSketch(CountMinSketchBase):
     """
     Implementation of Count-Mean-Min Sketch, a variation of Count-Min Sketch with noise adjustment.
     """
-    def __init__(self, width, depth):
-        """
-        Initialize sketch with given width and depth.
-        """
-        super().__init__(width, depth)
-        self.counters = np.zeros((self.depth, self.width), dtype=int)
-        self.totalCount = 0
+    STATE_ARRAYS = ("counters", "row_sums")
 
-    def _hash(self, x):
+    def __init__(self, width, depth, hash_family=None, counter_dtype=None):
         """
-        Generate multiple hash values using SHA-256 with added seed for depth variation.
+        Initialize sketch with given width, depth, hash family and counter dtype.
         """
-        base = str(x)
-        for i in range(self.depth):
-            h = hashlib.sha256((base + str(i)).encode('utf-8'))
-            yield int(h.hexdigest(), 16) % self.width
+        super().__init__(width, depth, hash_family, counter_dtype)
+        self.counters = self._new_counters((self.depth, self.width))
+        self.row_sums = np.zeros(self.depth, dtype=np.int64)  # sum of every row, kept up to date on add
+        self.totalCount = 0
 
     def add(self, item, count=1):
         """
         Add the element 'item' to the sketch 'count' times.
         """
         self.totalCount += count
+        self.row_sums += count
         for row, idx in zip(self.counters, self._hash(item)):
-            row[idx] += count
+            row[idx] = self._saturate(int(row[idx]) + count)
+
+    def add_many(self, items, counts=None):
+        """
+        Add every element of `items` in one vectorized scatter-add.
+        """
+        indices = self._index_matrix(items)
+        counts = self._as_counts(counts, indices.shape[1])
+        self.totalCount += int(counts.sum())
+        self.row_sums += int(counts.sum())
+        self._scatter_add(self.counters, (self._rows(), indices), counts)
 
     def _estimate_error(self, row_idx, col_idx):
         """
         Estimate the average noise in a particular row (excluding target cell).
+        Uses the maintained row sum, so the cost does not depend on the width.
         """
-        row = self.counters[row_idx]
-        target_value = row[col_idx]
-        row_sum = np.sum(row)
-        noise = (row_sum - target_value) / (self.width - 1) if self.width > 1 else 0
+        target_value = int(self.counters[row_idx][col_idx])
+        noise = (self.row_sums[row_idx] - target_value) / (self.width - 1) if self.width > 1 else 0
         return noise
 
     def query(self, item):
@@ -54,19 +57,52 @@ class CountMeanMinSketch(CountMinSketchBase):
         raw_values = []
 
         for i, (row, idx) in enumerate(zip(self.counters, self._hash(item))):
-            raw = row[idx]
+            raw = int(row[idx])
             noise = self._estimate_error(i, idx)
             estimates.append(raw - noise)
             raw_values.append(raw)
 
         return max(0, min(np.median(estimates), min(raw_values)))
 
+    def query_many(self, items):
+        """
+        Return the corrected frequency estimates for every element of `items` as a numpy array.
+        """
+        indices = self._index_matrix(items)
+        raw = self.counters[self._rows(), indices]
+        noise = (self.row_sums[:, None] - raw) / (self.width - 1) if self.width > 1 else 0
+        estimates = np.median(raw - noise, axis=0)
+        return np.maximum(0, np.minimum(estimates, raw.min(axis=0)))
+
+    def merge(self, other):
+        """
+        Add the counters and row sums of `other` to ours. The result is exactly the sketch of both streams.
+        """
+        self._merge_counters(other)
+        self.row_sums += other.row_sums
+
+    def to_sparse(self):
+        """
+        Return the sparse form of the sketch (see the base class), with its row sums.
+        """
+        sparse = super().to_sparse()
+        sparse["row_sums"] = self.row_sums.copy()
+        return sparse
+
+    def merge_sparse(self, sparse):
+        """
+        Add the counters and row sums of a sketch in sparse form to ours, exactly like `merge`.
+        """
+        self._merge_sparse_counters(sparse)
+        self.row_sums += sparse["row_sums"]
+
     def reset(self):
         """
         Reset the sketch to its initial state.
         """
         self.totalCount = 0
         self.counters.fill(0)
+        self.row_sums.fill(0)
 
     def get_load_factor(self):
         """
@@ -3,29 +3,18 @@ count_min_sketch.py
 Regular Count-Min Sketch implementation.
 """
 from summarization_algorithms.count_min_sketch_base import CountMinSketchBase
-import numpy as np
-import hashlib
 
 
 class CountMinSketch(CountMinSketchBase):
     """
     Regular Count-Min Sketch implementation.
     """
-    def __init__(self, width, depth):
+    def __init__(self, width, depth, hash_family=None, counter_dtype=None):
         """
-        Initialize sketch with width and depth.
+        Initialize sketch with width, depth, hash family and counter dtype.
         """
-        super().__init__(width, depth)
-        self.counters = np.zeros((self.depth, self.width), dtype=int)
-
-    def _hash(self, x):
-        """
-        Generate multiple hash values for a given input item using SHA-256
-        """
-        base = str(x)
-        for i in range(self.depth):
-            h = hashlib.sha256((base + str(i)).encode('utf-8'))
-            yield int(h.hexdigest(), 16) % self.width
+        super().__init__(width, depth, hash_family, counter_dtype)
+        self.counters = self._new_counters((self.depth, self.width))
 
     def add(self, item, count=1):
         """
@@ -33,7 +22,17 @@ class CountMinSketch(CountMinSketchBase):
         """
         self.totalCount += count
         for table, i in zip(self.counters, self._hash(item)):
-            table[i] += count
+            table[i] = self._saturate(int(table[i]) + count)
+
+    def add_many(self, items, counts=None):
+        """
+        Add every element of `items` in one vectorized scatter-add.
+        Duplicate items inside the batch are accumulated correctly.
+        """
+        indices = self._index_matrix(items)
+        counts = self._as_counts(counts, indices.shape[1])
+        self.totalCount += int(counts.sum())
+        self._scatter_add(self.counters, (self._rows(), indices), counts)
 
     def query(self, item):
         """
@@ -42,6 +41,25 @@ class CountMinSketch(CountMinSketchBase):
         """
         return min(table[i] for table, i in zip(self.counters, self._hash(item)))
 
+    def query_many(self, items):
+        """
+        Return a numpy array with the estimation for every element of `items`.
+        """
+        indices = self._index_matrix(items)
+        return self.counters[self._rows(), indices].min(axis=0)
+
+    def merge(self, other):
+        """
+        Add the counters of `other` to ours. The result is exactly the sketch of both streams.
+        """
+        self._merge_counters(other)
+
+    def merge_sparse(self, sparse):
+        """
+        Add the counters of a sketch in sparse form (see `to_sparse`) to ours, exactly like `merge`.
+        """
+        self._merge_sparse_counters(sparse)
+
     def reset(self):
         """
         Reset the sketch by clearing all tables and setting the count to 0.
@@ -6,8 +6,17 @@ This file contains the abstract base class for Count-Min Sketch (CMS) implementa
 
 Subclasses must implement the `add`, `query`, and `reset` methods.
 Subclasses may implement the`__init__` method if additional parameters are needed.
+Subclasses should override `add_many` and `query_many` with vectorized versions.
+Linear sketches should override `merge` and `merge_sparse` (see `_merge_counters` and `_merge_sparse_counters`).
+Counters are allocated with `_new_counters` and updated with saturating arithmetic,
+so they can use any of the `COUNTER_DTYPES`.
 """
 import abc
+import copy
+import numpy as np
+from summarization_algorithms.hashing import get_hash_family
+
+COUNTER_DTYPES = ("uint8", "uint16", "uint32", "int32", "int64")
 
 
 class CountMinSketchBase(abc.ABC):
@@ -15,14 +24,25 @@ class CountMinSketchBase(abc.ABC):
     Abstract base class for Count-Min Sketch implementations.
     Defines the core structure and methods of Count-Min Sketches.
     """
-    def __init__(self, width, depth, *args, **kwargs):
+    # Attributes that make up the state of the sketch, saved by checkpoints: numpy arrays and plain scalars
+    STATE_ARRAYS = ("counters",)
+    STATE_SCALARS = ("totalCount",)
+
+    def __init__(self, width, depth, hash_family=None, counter_dtype=None, *args, **kwargs):
         """
-        Initialize sketch with width, depth, and seed.
+        Initialize sketch with width, depth, hash family (a name or a HashFamily instance)
+        and counter dtype (one of COUNTER_DTYPES, int64 by default).
         Subclasses may require additional parameters.
         """
         self.width = width
         self.depth = depth
         self.totalCount = 0
+        self.hash_family = get_hash_family(hash_family)
+        self.counter_dtype = np.dtype(counter_dtype or np.int64)
+        if self.counter_dtype.name not in COUNTER_DTYPES:
+            raise ValueError(f"Unsupported counter dtype: {counter_dtype}. Expected one of {COUNTER_DTYPES}.")
+        self.counter_min = int(np.iinfo(self.counter_dtype).min)
+        self.counter_max = int(np.iinfo(self.counter_dtype).max)
 
         pass  # Allow subclasses to handle additional parameters as necessary
 
@@ -40,6 +60,151 @@ class CountMinSketchBase(abc.ABC):
         """
         pass
 
+    def add_many(self, items, counts=None):
+        """
+        Add every element of the sequence `items` to the sketch.
+        `counts` may be None (each item once), a scalar, or one count per item.
+        The default implementation falls back to `add` item by item.
+        """
+        counts = self._as_counts(counts, len(items))
+        for item, count in zip(items, counts.tolist()):
+            self.add(item, count)
+
+    def query_many(self, items):
+        """
+        Query every element of the sequence `items` and return a numpy array of estimates.
+        The default implementation falls back to `query` item by item.
+        """
+        return np.array([self.query(item) for item in items])
+
+    def merge(self, other):
+        """
+        Merge `other`, a sketch of the same class, shape and hash family, into this sketch in place,
+        so that it summarizes both streams. Only linear sketches support merging.
+        """
+        raise NotImplementedError(f"{self.__class__.__name__} does not support merging.")
+
+    def _merge_counters(self, other):
+        """
+        Check that `other` can be merged into this sketch, then add its counters (saturating)
+        and its total count to ours.
+        """
+        if type(other) is not type(self):
+            raise TypeError(f"Cannot merge {type(other).__name__} into {type(self).__name__}.")
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Cannot merge sketches of different width or depth.")
+        if repr(other.hash_family) != repr(self.hash_family):
+            raise ValueError("Cannot merge sketches built with different hash families.")
+        if self.counters.dtype == np.int64:
+            self.counters += other.counters
+        else:
+            merged = self.counters.astype(np.int64) + other.counters
+            self.counters[...] = np.clip(merged, self.counter_min, self.counter_max)
+        self.totalCount += other.totalCount
+
+    def to_sparse(self):
+        """
+        Return the state of the sketch as a dict holding the flat positions ("cells") and values of its
+        non-zero counters and its total count: while few cells are set, much smaller than the counters,
+        e.g. to send the sketch of a shard to another process. See `merge_sparse`.
+        """
+        cells = np.flatnonzero(self.counters)
+        return {"cells": cells, "values": self.counters.flat[cells], "totalCount": self.totalCount}
+
+    def merge_sparse(self, sparse):
+        """
+        Merge a sketch given in the form returned by its `to_sparse`, like `merge`.
+        The sketch must have the same class, shape and hash family; this is not checked.
+        """
+        raise NotImplementedError(f"{self.__class__.__name__} does not support merging.")
+
+    def _merge_sparse_counters(self, sparse):
+        """
+        Add the counters (saturating) and the total count of a sketch in sparse form to ours.
+        """
+        cells = sparse["cells"]
+        merged = self.counters.flat[cells].astype(np.int64) + sparse["values"]
+        if self.counters.dtype != np.int64:
+            merged = np.clip(merged, self.counter_min, self.counter_max)
+        self.counters.flat[cells] = merged
+        self.totalCount += sparse["totalCount"]
+
+    def snapshot(self):
+        """
+        Return a frozen copy of the sketch for evaluation. Only the state arrays are copied, each
+        one contiguously; parameters and the hash family are shared with the live sketch.
+        """
+        frozen = copy.copy(self)
+        for field in self.STATE_ARRAYS:
+            setattr(frozen, field, getattr(self, field).copy())
+        return frozen
+
+    def __add__(self, other):
+        """
+        Return a new sketch summarizing the streams of both sketches.
+        """
+        merged = copy.deepcopy(self)
+        merged.merge(other)
+        return merged
+
+    def _hash(self, x):
+        """
+        Return the column index of `x` in every row.
+        """
+        return self.hash_family.indices(x, self.depth, self.width)
+
+    def _index_matrix(self, items):
+        """
+        Return a (depth x n) matrix holding the column index of every item in every row.
+        """
+        return self.hash_family.indices_many(items, self.depth, self.width)
+
+    def _rows(self):
+        """
+        Return the row numbers as a column vector, ready to pair with an index matrix.
+        """
+        return np.arange(self.depth)[:, None]
+
+    def _new_counters(self, shape):
+        """
+        Return a zeroed counter array of the given shape and of the counter dtype.
+        """
+        return np.zeros(shape, dtype=self.counter_dtype)
+
+    def _saturate(self, value):
+        """
+        Clamp a Python integer to the range of the counter dtype.
+        """
+        return min(max(value, self.counter_min), self.counter_max)
+
+    def _scatter_add(self, counters, index, values):
+        """
+        Add `values` to `counters[index]` like `np.add.at`, saturating at the range of the
+        counter dtype instead of wrapping around. Repeated positions are summed in int64 first.
+        """
+        if counters.dtype == np.int64:
+            np.add.at(counters, index, values)
+            return
+        flat = np.ravel_multi_index(index, counters.shape)
+        cells, inverse = np.unique(flat, return_inverse=True)
+        sums = np.zeros(cells.size, dtype=np.int64)
+        np.add.at(sums, inverse.ravel(), np.broadcast_to(values, flat.shape).ravel())
+        counters.flat[cells] = np.clip(counters.flat[cells] + sums, self.counter_min, self.counter_max)
+
+    @staticmethod
+    def _as_counts(counts, n):
+        """
+        Normalize the `counts` argument of `add_many` to an int64 array of length n.
+        """
+        if counts is None:
+            return np.ones(n, dtype=np.int64)
+        counts = np.asarray(counts, dtype=np.int64)
+        if counts.ndim == 0:
+            return np.full(n, counts, dtype=np.int64)
+        if counts.shape != (n,):
+            raise ValueError("counts must be a scalar or hold one entry per item.")
+        return counts
+
     @abc.abstractmethod
     def reset(self):
         """
@@ -54,6 +219,12 @@ class CountMinSketchBase(abc.ABC):
         """
         pass
 
+    def get_memory_usage(self):
+        """
+        Return the number of bytes held by the counters of the sketch.
+        """
+        return self.counters.nbytes
+
     def __repr__(self):
         return f"{self.__class__.__name__}(width={self.width}, depth={self.depth})"
 
@@ -1,6 +1,5 @@
 from summarization_algorithms.count_min_sketch_base import CountMinSketchBase
 import numpy as np
-import hashlib
 import random
 
 
@@ -9,36 +8,62 @@ class CountSketch(CountMinSketchBase):
     Fast-AGMS / Count Sketch implementation.
     This sketch provides unbiased frequency estimation.
     """
-    def __init__(self, width, depth):
-        super().__init__(width, depth)
-        self.counters = np.zeros((self.depth, self.width), dtype=int)
+    def __init__(self, width, depth, hash_family=None, counter_dtype=None):
+        super().__init__(width, depth, hash_family, counter_dtype)
+        if self.counter_min == 0:
+            raise ValueError("CountSketch needs a signed counter dtype.")
+        self.counters = self._new_counters((self.depth, self.width))
 
-    def _hash_index(self, x):
+    def _hash_with_signs(self, x):
         """
-        Generate multiple hash values for a given input item using SHA-256
+        Return the column indices and the +1/-1 signs of `x` in every row, from one hash evaluation.
         """
-        base = str(x)
-        for i in range(self.depth):
-            h = hashlib.sha256((base + str(i)).encode('utf-8'))
-            yield int(h.hexdigest(), 16) % self.width
+        return self.hash_family.indices_and_signs(x, self.depth, self.width)
 
-    def _hash_sign(self, x):
-        base = str(x)
-        for i in range(self.depth):
-            h = hashlib.sha256((base + "_sign" + str(i)).encode('utf-8'))
-            yield 1 if int(h.hexdigest(), 16) % 2 == 0 else -1
+    def _index_sign_matrices(self, items):
+        """
+        Return the (depth x n) index and sign matrices of `items`.
+        """
+        return self.hash_family.indices_and_signs_many(items, self.depth, self.width)
 
     def add(self, item, count=1):
         self.totalCount += abs(count)
-        for row, idx, sign in zip(self.counters, self._hash_index(item), self._hash_sign(item)):
-            row[idx] += sign * count
+        indices, signs = self._hash_with_signs(item)
+        for row, idx, sign in zip(self.counters, indices, signs):
+            row[idx] = self._saturate(int(row[idx]) + sign * count)
+
+    def add_many(self, items, counts=None):
+        """
+        Add every element of `items` by scatter-adding the signed counts.
+        """
+        indices, signs = self._index_sign_matrices(items)
+        counts = self._as_counts(counts, indices.shape[1])
+        self.totalCount += int(np.abs(counts).sum())
+        self._scatter_add(self.counters, (self._rows(), indices), signs * counts)
 
     def query(self, item):
-        estimates = []
-        for row, idx, sign in zip(self.counters, self._hash_index(item), self._hash_sign(item)):
-            estimates.append(sign * row[idx])
+        indices, signs = self._hash_with_signs(item)
+        estimates = [sign * int(row[idx]) for row, idx, sign in zip(self.counters, indices, signs)]
         return int(np.median(estimates))
 
+    def query_many(self, items):
+        """
+        Return the median estimate of every element of `items` as a numpy array:
+        the (depth x n) signed estimates are gathered at once and reduced along the rows.
+        """
+        indices, signs = self._index_sign_matrices(items)
+        estimates = signs * self.counters[self._rows(), indices]
+        return np.median(estimates, axis=0).astype(np.int64)
+
+    def merge(self, other):
+        """
+        Add the signed counters of `other` to ours. The result is exactly the sketch of both streams.
+        """
+        self._merge_counters(other)
+
+    def merge_sparse(self, sparse):
+        self._merge_sparse_counters(sparse)
+
     def reset(self):
         self.totalCount = 0
         self.counters.fill(0)
@@ -1,4 +1,4 @@
-import hashlib
+import copy
 from summarization_algorithms.count_min_sketch_base import CountMinSketchBase
 
 
@@ -16,23 +16,14 @@ class Counter:
 
 
 class ExpCountMinSketch(CountMinSketchBase):
-    def __init__(self, width, depth, window_size=1, counter_size=4):
-        super().__init__(width, depth)
+    def __init__(self, width, depth, window_size=1, counter_size=4, hash_family=None):
+        super().__init__(width, depth, hash_family)
         self.window_size = window_size
         self.counter_size = counter_size
         self.counter = [[Counter() for _ in range(self.width)] for _ in range(self.depth)]
         self.mem_acc = 0
         self.MAX_CNT = (1 << counter_size) - 1
 
-    def _hash(self, x):
-        """
-        Generate multiple hash values for a given input item using SHA-256
-        """
-        base = str(x)
-        for i in range(self.depth):
-            h = hashlib.sha256((base + str(i)).encode('utf-8'))
-            yield int(h.hexdigest(), 16) % self.width
-
     def _expire_bucket(self, i, j, t):
         z = self.counter[i][j].number - 1
         if z >= -1:
@@ -129,6 +120,12 @@ class ExpCountMinSketch(CountMinSketchBase):
             min_val = min(min_val, temp)
         return min_val
 
+    def snapshot(self):
+        """
+        The histograms are Python objects rather than numpy arrays, so the snapshot is a deep copy.
+        """
+        return copy.deepcopy(self)
+
     def reset(self):
         self.counter = [[Counter() for _ in range(self.width)] for _ in range(self.depth)]
         self.totalCount = 0
@@ -0,0 +1,313 @@
+"""
+hashing.py
+Hash families used by the sketches to map an item to one column (and one sign) per row.
+
+Every family implements `indices` (one column index per row) and `signs` (one +1/-1 per row),
+plus the batched `indices_many` / `signs_many` returning (depth x n) numpy matrices.
+`indices_and_signs` / `indices_and_signs_many` return both from a single hash evaluation
+where the family allows it.
+Sketches receive a family, or the name of one, through their `hash_family` argument.
+
+Available families:
+    - "sha256": one SHA-256 digest per row, the original scheme (kept for reproducibility).
+    - "double": one digest per item, split into `depth` indices with double hashing.
+    - "seeded": a seeded non-cryptographic 64-bit hash with double hashing.
+    - "multiply_shift": multiply-shift hashing of 64-bit integer keys (pairwise independent
+      indices for keys below 2^33), vectorized over integer numpy arrays.
+"""
+import abc
+import hashlib
+import itertools
+import zlib
+import numpy as np
+
+MASK64 = (1 << 64) - 1
+
+
+def _splitmix64(x):
+    """
+    SplitMix64 finalizer: scramble a 64-bit integer so every input bit affects every output bit.
+    """
+    x = (x + 0x9E3779B97F4A7C15) & MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+
+class HashFamily(abc.ABC):
+    """
+    Abstract base class for hash families.
+    """
+    name = None
+
+    def __init__(self, seed=0):
+        self.seed = seed
+
+    @abc.abstractmethod
+    def indices(self, x, depth, width):
+        """
+        Return a list with the column index of `x` in each of the `depth` rows.
+        """
+        pass
+
+    @abc.abstractmethod
+    def signs(self, x, depth):
+        """
+        Return a list with the +1/-1 sign of `x` in each of the `depth` rows.
+        """
+        pass
+
+    def indices_many(self, items, depth, width):
+        """
+        Return a (depth x n) int64 matrix with the column index of every item in every row.
+        """
+        n = len(items)
+        indices = np.fromiter(itertools.chain.from_iterable(self.indices(x, depth, width) for x in items),
+                              dtype=np.int64, count=n * depth)
+        return indices.reshape(n, depth).T
+
+    def signs_many(self, items, depth):
+        """
+        Return a (depth x n) int64 matrix with the sign of every item in every row.
+        """
+        n = len(items)
+        signs = np.fromiter(itertools.chain.from_iterable(self.signs(x, depth) for x in items),
+                            dtype=np.int64, count=n * depth)
+        return signs.reshape(n, depth).T
+
+    def indices_and_signs(self, x, depth, width):
+        """
+        Return the (indices, signs) lists of `x`.
+        """
+        return self.indices(x, depth, width), self.signs(x, depth)
+
+    def indices_and_signs_many(self, items, depth, width):
+        """
+        Return the (depth x n) index and sign matrices of `items`.
+        """
+        return self.indices_many(items, depth, width), self.signs_many(items, depth)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(seed={self.seed})"
+
+
+class Sha256Hash(HashFamily):
+    """
+    The original scheme: a separate SHA-256 digest of `str(x) + str(row)` for every row.
+    Slow, but reproduces the results of earlier experiments exactly, which is also why
+    its signs keep coming from their own digests instead of sharing the index digest.
+    """
+    name = "sha256"
+
+    def indices(self, x, depth, width):
+        base = str(x)
+        return [int(hashlib.sha256((base + str(i)).encode('utf-8')).hexdigest(), 16) % width
+                for i in range(depth)]
+
+    def signs(self, x, depth):
+        base = str(x)
+        return [1 if int(hashlib.sha256((base + "_sign" + str(i)).encode('utf-8')).hexdigest(), 16) % 2 == 0 else -1
+                for i in range(depth)]
+
+
+class DoubleHashFamily(HashFamily, abc.ABC):
+    """
+    Base class for families that derive all rows from two 64-bit values (h1, h2) per item:
+    the index in row i is (h1 + i * h2) mod 2^64 mod width (Kirsch-Mitzenmacher double hashing),
+    and the sign in row i is bit (63 - i) of a third value h3.
+    """
+    @abc.abstractmethod
+    def _base_hashes(self, x):
+        """
+        Return the three 64-bit values (h1, h2, h3) of `x`; h2 must be odd.
+        """
+        pass
+
+    def indices(self, x, depth, width):
+        h1, h2, _ = self._base_hashes(x)
+        return [((h1 + i * h2) & MASK64) % width for i in range(depth)]
+
+    def signs(self, x, depth):
+        _, _, h3 = self._base_hashes(x)
+        return [1 - 2 * ((h3 >> (63 - i)) & 1) for i in range(depth)]
+
+    def indices_and_signs(self, x, depth, width):
+        h1, h2, h3 = self._base_hashes(x)
+        return ([((h1 + i * h2) & MASK64) % width for i in range(depth)],
+                [1 - 2 * ((h3 >> (63 - i)) & 1) for i in range(depth)])
+
+    def _base_matrix(self, items):
+        """
+        Return a (3 x n) uint64 matrix with the base hashes of every item.
+        """
+        n = len(items)
+        base = np.fromiter(itertools.chain.from_iterable(self._base_hashes(x) for x in items),
+                           dtype=np.uint64, count=3 * n)
+        return base.reshape(n, 3).T
+
+    def indices_many(self, items, depth, width):
+        h1, h2, _ = self._base_matrix(items)
+        rows = np.arange(depth, dtype=np.uint64)[:, None]
+        return ((h1 + rows * h2) % np.uint64(width)).astype(np.int64)
+
+    def signs_many(self, items, depth):
+        _, _, h3 = self._base_matrix(items)
+        return self._expand_signs(h3, depth)
+
+    def indices_and_signs_many(self, items, depth, width):
+        h1, h2, h3 = self._base_matrix(items)
+        rows = np.arange(depth, dtype=np.uint64)[:, None]
+        return ((h1 + rows * h2) % np.uint64(width)).astype(np.int64), self._expand_signs(h3, depth)
+
+    @staticmethod
+    def _expand_signs(h3, depth):
+        bits = (h3 >> (63 - np.arange(depth, dtype=np.uint64))[:, None]) & np.uint64(1)
+        return 1 - 2 * bits.astype(np.int64)
+
+
+class DoubleHash(DoubleHashFamily):
+    """
+    One keyed BLAKE2b digest per item, split into the three base hashes.
+    """
+    name = "double"
+
+    def __init__(self, seed=0):
+        super().__init__(seed)
+        self._key = seed.to_bytes(8, 'little')
+
+    def _base_hashes(self, x):
+        digest = hashlib.blake2b(str(x).encode('utf-8'), digest_size=24, key=self._key).digest()
+        return (int.from_bytes(digest[:8], 'little'),
+                int.from_bytes(digest[8:16], 'little') | 1,
+                int.from_bytes(digest[16:], 'little'))
+
+
+class SeededHash(DoubleHashFamily):
+    """
+    A seeded non-cryptographic 64-bit hash: two seeded CRC-32 values of the item,
+    scrambled with the SplitMix64 finalizer. The other base hashes are cheap derivations of it.
+    """
+    name = "seeded"
+
+    def __init__(self, seed=0):
+        super().__init__(seed)
+        self._seed_lo = seed & 0xFFFFFFFF
+        self._seed_hi = (seed >> 32 ^ 0x5BD1E995) & 0xFFFFFFFF
+
+    def _base_hashes(self, x):
+        data = str(x).encode('utf-8')
+        h1 = _splitmix64(zlib.crc32(data, self._seed_lo) << 32 | zlib.crc32(data, self._seed_hi))
+        h2 = (h1 >> 32 | h1 << 32) & MASK64 | 1
+        return h1, h2, (h1 * 0x9E3779B97F4A7C15) & MASK64
+
+
+class MultiplyShiftHash(HashFamily):
+    """
+    Multiply-add-shift hashing (Dietzfelbinger) of 64-bit integer keys: row i takes the top 32 bits
+    of (a_i * key + b_i) mod 2^64 and scales them to the width; the sign is the top bit of a second
+    row hash (c_i * key + d_i) mod 2^64.
+    With 64-bit arithmetic, the indices are pairwise independent for keys below 2^33; larger keys
+    are still universal (two keys share a row index with probability at most 2 / 2^32 before scaling).
+    The signs are pairwise independent over all 64-bit keys.
+    Integer items are their own keys, so an integer numpy array is hashed into the full index
+    matrix in one vectorized operation. Any other item is first reduced to a key with SeededHash.
+    """
+    name = "multiply_shift"
+
+    def __init__(self, seed=0):
+        super().__init__(seed)
+        self._key_hash = SeededHash(seed)
+        self._rows = np.empty((0, 4), dtype=np.uint64)
+        self._quads = []
+
+    def _coefficients(self, depth):
+        """
+        Return the (a, b, c, d) coefficients of the first `depth` rows; a and c are odd.
+        Each row draws from its own seeded generator, so the coefficients do not depend on `depth`.
+        """
+        if len(self._rows) < depth:
+            rows = np.array([np.random.default_rng([self.seed, i]).integers(0, 2 ** 64, size=4, dtype=np.uint64)
+                             for i in range(depth)])
+            rows[:, 0] |= np.uint64(1)
+            rows[:, 2] |= np.uint64(1)
+            self._rows = rows
+            self._quads = [tuple(row) for row in rows.tolist()]
+        return self._rows[:depth].T
+
+    def _row_quads(self, depth):
+        """
+        Return the coefficients of the first `depth` rows as Python integers, for the per-item path.
+        """
+        self._coefficients(depth)
+        return self._quads[:depth]
+
+    def _key(self, x):
+        """
+        Return the 64-bit key of a single item.
+        """
+        if isinstance(x, (int, np.integer)):
+            return int(x) & MASK64
+        return self._key_hash._base_hashes(x)[0]
+
+    def _keys(self, items):
+        """
+        Return the uint64 keys of `items`; integer arrays are reinterpreted without any per-item work.
+        """
+        if isinstance(items, np.ndarray) and items.dtype.kind in 'iub':
+            if items.dtype.kind == 'u':
+                return items.astype(np.uint64, copy=False)
+            return items.astype(np.int64, copy=False).view(np.uint64)
+        return np.fromiter((self._key(x) for x in items), dtype=np.uint64, count=len(items))
+
+    def _index_matrix(self, keys, depth, width):
+        a, b, _, _ = self._coefficients(depth)
+        hashes = a[:, None] * keys[None, :] + b[:, None]
+        return (((hashes >> np.uint64(32)) * np.uint64(width)) >> np.uint64(32)).astype(np.int64)
+
+    def _sign_matrix(self, keys, depth):
+        _, _, c, d = self._coefficients(depth)
+        hashes = c[:, None] * keys[None, :] + d[:, None]
+        return 1 - 2 * (hashes >> np.uint64(63)).astype(np.int64)
+
+    def indices(self, x, depth, width):
+        key = self._key(x)
+        return [((((a * key + b) & MASK64) >> 32) * width) >> 32 for a, b, _, _ in self._row_quads(depth)]
+
+    def signs(self, x, depth):
+        key = self._key(x)
+        return [1 - 2 * (((c * key + d) & MASK64) >> 63) for _, _, c, d in self._row_quads(depth)]
+
+    def indices_and_signs(self, x, depth, width):
+        key = self._key(x)
+        indices, signs = [], []
+        for a, b, c, d in self._row_quads(depth):
+            indices.append(((((a * key + b) & MASK64) >> 32) * width) >> 32)
+            signs.append(1 - 2 * (((c * key + d) & MASK64) >> 63))
+        return indices, signs
+
+    def indices_many(self, items, depth, width):
+        return self._index_matrix(self._keys(items), depth, width)
+
+    def signs_many(self, items, depth):
+        return self._sign_matrix(self._keys(items), depth)
+
+    def indices_and_signs_many(self, items, depth, width):
+        keys = self._keys(items)
+        return self._index_matrix(keys, depth, width), self._sign_matrix(keys, depth)
+
+
+HASH_FAMILIES = {family.name: family for family in (Sha256Hash, DoubleHash, SeededHash, MultiplyShiftHash)}
+
+
+def get_hash_family(hash_family=None, seed=0):
+    """
+    Return a hash family instance.
+    `hash_family` may be None (the original SHA-256 scheme), a family name, or a HashFamily instance.
+    """
+    if hash_family is None:
+        hash_family = Sha256Hash.name
+    if isinstance(hash_family, HashFamily):
+        return hash_family
+    if hash_family not in HASH_FAMILIES:
+        raise ValueError(f"Unknown hash family: {hash_family}")
+    return HASH_FAMILIES[hash_family](seed=seed)
@@ -1,24 +1,18 @@
 import numpy as np
-import hashlib
 from summarization_algorithms.count_min_sketch_base import CountMinSketchBase
 
 
 class SlidingCountMinSketch(CountMinSketchBase):
-    def __init__(self, width, depth):
-        super().__init__(width, depth)
+    STATE_SCALARS = ("totalCount", "scan_pointer")
+
+    def __init__(self, width, depth, hash_family=None, counter_dtype=None):
+        super().__init__(width, depth, hash_family, counter_dtype)
         self.total_slots = width * depth  # m
         self.window_size = self.total_slots  # N
         self.mN = 1  # how many buckets scanned per arrival
-        self.counters = np.zeros((depth, width, 2), dtype=int)  # Two fields per counter: A[i][0] and A[i][1]
+        self.counters = self._new_counters((depth, width, 2))  # Two fields per counter: A[i][0] and A[i][1]
         self.scan_pointer = 0  # flat index in total_slots
 
-    def _hash(self, item, i):
-        """
-        Return the i-th hash value for an item using SHA-256.
-        """
-        h = hashlib.sha256((str(item) + str(i)).encode('utf-8'))
-        return int(h.hexdigest(), 16) % self.width
-
     def _scan_step(self):
         """
         Perform a scan step over the sliding window:
@@ -26,32 +20,83 @@ class SlidingCountMinSketch(CountMinSketchBase):
         - Reset current counter to 0.
         - Advance scan pointer.
         """
-        for _ in range(self.mN):
-            d = self.scan_pointer // self.width
-            w = self.scan_pointer % self.width
-
-            # Scanning operation:
-            # - delete A[i][1] (just reset it)
-            # - copy A[i][0] to A[i][1]
-            # - set A[i][0] to 0
-
-            self.counters[d][w][1] = self.counters[d][w][0]
-            self.counters[d][w][0] = 0
+        self._advance_scan(self.mN)
 
-            self.scan_pointer = (self.scan_pointer + 1) % self.total_slots
+    def _advance_scan(self, k):
+        """
+        Scan the next `k` slots at once with slice moves, wrapping around the end of the table.
+        """
+        # Flat slot f is A[f // width][f % width]
+        slots = self.counters.reshape(self.total_slots, 2)
+        while k > 0:
+            start = self.scan_pointer
+            end = min(start + k, self.total_slots)
+            slots[start:end, 1] = slots[start:end, 0]
+            slots[start:end, 0] = 0
+            k -= end - start
+            self.scan_pointer = end % self.total_slots
 
     def add(self, item, count=1):
         """
         Add an item (possibly multiple times) to the sketch.
-        Advances the scan pointer before each insertion to maintain window.
+        Every unit of count is one arrival that advances the scan pointer before its insertion;
+        the item is hashed once and all the arrivals are applied in bulk.
         """
-        for _ in range(count):
-            # Advance scan pointer before updating
+        indices = self._hash(item)
+        if count == 1:
             self._scan_step()
-            for i in range(self.depth):
-                pos = self._hash(item, i)
-                self.counters[i][pos][0] += 1
+            for i, pos in enumerate(indices):
+                if self.counters[i, pos, 0] < self.counter_max:
+                    self.counters[i, pos, 0] += 1
             self.totalCount += 1
+        else:
+            self._add_runs(self._flat_slots(np.array(indices)[:, None]), np.array([count]))
+
+    def add_many(self, items, counts=None):
+        """
+        Add every element of `items`, in order; each unit of count is one arrival.
+        Equivalent to calling `add` sequentially.
+        """
+        indices = self._index_matrix(items)
+        self._add_runs(self._flat_slots(indices), self._as_counts(counts, indices.shape[1]))
+
+    def _flat_slots(self, indices):
+        """
+        Convert a (depth x n) index matrix into flat slot numbers.
+        """
+        return indices + (np.arange(self.depth) * self.width)[:, None]
+
+    def _add_runs(self, flat, counts):
+        """
+        Insert the item of column j `counts[j]` times in a row, column after column.
+        The arrivals are split into chunks short enough that no slot is scanned twice within one.
+        """
+        ends = np.cumsum(counts)
+        starts = ends - counts
+        arrivals = int(ends[-1]) if len(ends) else 0
+        chunk = max(1, self.total_slots // self.mN)
+        for lo in range(0, arrivals, chunk):
+            hi = min(lo + chunk, arrivals)
+            window = slice(np.searchsorted(ends, lo, side='right'), np.searchsorted(starts, hi, side='left'))
+            run_starts = np.maximum(starts[window], lo)
+            self._add_chunk(flat[:, window], run_starts - lo, np.minimum(ends[window], hi) - run_starts, hi - lo)
+
+    def _add_chunk(self, flat, starts, units, arrivals):
+        """
+        Apply `arrivals` consecutive arrivals: column j is inserted `units[j]` times starting at
+        arrival `starts[j]`. The slot at distance `offset` from the scan pointer is scanned right
+        before arrival `offset // mN`, so the insertions that precede that scan end up in A[i][1]
+        and the others stay in A[i][0].
+        """
+        scanned = arrivals * self.mN
+        offset = (flat - self.scan_pointer) % self.total_slots
+        moved = np.where(offset < scanned, np.clip(offset // self.mN - starts, 0, units), 0)
+
+        self._advance_scan(scanned)
+        slots = self.counters.reshape(self.total_slots, 2)
+        self._scatter_add(slots[:, 1], (flat,), moved)
+        self._scatter_add(slots[:, 0], (flat,), units - moved)
+        self.totalCount += arrivals
 
     def query(self, item):
         """
@@ -59,12 +104,19 @@ class SlidingCountMinSketch(CountMinSketchBase):
         Combines both active and backup counters.
         """
         est = float('inf')
-        for i in range(self.depth):
-            pos = self._hash(item, i)
-            val = self.counters[i][pos][0] + self.counters[i][pos][1]
+        for i, pos in enumerate(self._hash(item)):
+            val = int(self.counters[i][pos][0]) + int(self.counters[i][pos][1])
             est = min(est, val)
         return est
 
+    def query_many(self, items):
+        """
+        Return the window estimate of every element of `items` as a numpy array.
+        """
+        indices = self._index_matrix(items)
+        cells = self.counters[self._rows(), indices].astype(np.int64)
+        return (cells[..., 0] + cells[..., 1]).min(axis=0)
+
     def reset(self):
         """Reset the sketch to an empty state."""
         self.counters.fill(0)
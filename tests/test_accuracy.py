@@ -1,6 +1,12 @@
+import heapq
 import unittest
+from types import SimpleNamespace
 from unittest.mock import MagicMock
+import numpy as np
 from evaluation.accuracy import evaluate_accuracy
+from evaluation.avg_query_time import evaluate_avg_query_time
+from ground_truth.truth import Truth
+from summarization_algorithms.count_sketch import CountSketch
 
 
 class TestAccuracyEvaluation(unittest.TestCase):
@@ -84,5 +90,68 @@ class TestAccuracyEvaluation(unittest.TestCase):
         self.assertEqual(result['exact_match_percentage'], 0)  # No exact matches
 
 
+
+class TestAccuracyEvaluationLargeInputs(unittest.TestCase):
+    def setUp(self):
+        """
+        Setup a narrow Count Sketch over a Zipf stream: tens of thousands of keys, both
+        overestimated and underestimated, with many tied errors.
+        """
+        items = np.random.default_rng(4).zipf(1.2, size=30000).tolist()
+        keys, counts = np.unique(items, return_counts=True)
+        self.ground_truth = dict(zip(keys.tolist(), counts.tolist()))
+        self.cms = CountSketch(width=100, depth=5)
+        self.cms.add_many(items)
+
+    def test_batched_sketch_matches_per_item_queries(self):
+        result = evaluate_accuracy(self.cms, self.ground_truth)
+        errors = {item: self.cms.query(item) - count for item, count in self.ground_truth.items()}
+        over = [(item, error) for item, error in errors.items() if error > 0]
+        under = [(item, error) for item, error in errors.items() if error < 0]
+
+        self.assertEqual(result['top_20_overestimations'], heapq.nlargest(20, over, key=lambda x: x[1]))
+        self.assertEqual(result['top_20_underestimations'], heapq.nsmallest(20, under, key=lambda x: x[1]))
+        self.assertAlmostEqual(result['avg_error'], sum(abs(e) for e in errors.values()) / len(errors))
+        self.assertAlmostEqual(result['overestimation_percentage'], len(over) / len(errors) * 100)
+        self.assertAlmostEqual(result['underestimation_percentage'], len(under) / len(errors) * 100)
+        self.assertEqual(result['overestimation_percentiles']['90th'], np.percentile([e for _, e in over], 90))
+        self.assertEqual(result['underestimation_percentiles']['50th'], np.percentile([-e for _, e in under], 50))
+
+    def test_mock_and_sketch_paths_agree(self):
+        """
+        An object that only implements `query` goes through the per-item path and must give the same result.
+        """
+        query_only = SimpleNamespace(query=self.cms.query)
+        self.assertEqual(evaluate_accuracy(query_only, self.ground_truth), evaluate_accuracy(self.cms, self.ground_truth))
+
+    def test_sampled_evaluation(self):
+        truth = Truth(heavy_threshold=50)
+        for item, count in self.ground_truth.items():
+            for _ in range(count):
+                truth.add(item)
+        full = evaluate_accuracy(self.cms, self.ground_truth)
+
+        # A sample as large as the tail covers every key, so the metrics are exact
+        exhaustive = evaluate_accuracy(self.cms, truth.snapshot(), sample_size=len(self.ground_truth),
+                                       heavy_threshold=50, seed=0)
+        self.assertEqual(exhaustive['sample_size'], len(self.ground_truth))
+        for metric in ('avg_error', 'overestimation_percentage', 'underestimation_percentage'):
+            self.assertAlmostEqual(exhaustive[metric], full[metric])
+
+        sampled = evaluate_accuracy(self.cms, truth.snapshot(), sample_size=500, heavy_threshold=50, seed=0)
+        heavy_hitters = sum(1 for count in self.ground_truth.values() if count >= 50)
+        self.assertEqual(sampled['sample_size'], heavy_hitters + 500)
+        low, high = sampled['confidence_intervals']['avg_error']
+        self.assertLessEqual(low, sampled['avg_error'])
+        self.assertGreaterEqual(high, sampled['avg_error'])
+        self.assertLess(abs(sampled['avg_error'] - full['avg_error']), 0.2 * full['avg_error'])
+        self.assertEqual(set(sampled['confidence_intervals']['combined_percentiles']), {'50th', '90th', '95th', '100th'})
+
+        # The query timing of a sampled evaluation only queries the sampled keys
+        cms = MagicMock()
+        evaluate_avg_query_time(cms, truth.snapshot(), test_items=sampled['sampled_items'])
+        self.assertEqual(cms.query.call_count, sampled['sample_size'])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,50 @@
+import tempfile
+import unittest
+import numpy as np
+from ground_truth.decaying_truth import DecayingTruth
+from persistence.checkpoint import Checkpoint
+from summarization_algorithms.count_min_sketch import CountMinSketch
+from summarization_algorithms.sliding_count_min_sketch import SlidingCountMinSketch
+
+
+class TestCheckpoint(unittest.TestCase):
+    def test_resume_matches_uninterrupted_run(self):
+        """
+        Updates made after the last checkpoint are lost, and replaying the stream from the saved
+        position reproduces the uninterrupted run.
+        """
+        items = np.random.default_rng(2).zipf(1.3, size=4000).tolist()
+        reference, reference_truth = SlidingCountMinSketch(width=40, depth=3), DecayingTruth(window_size=120)
+        for item in items:
+            reference.add(item)
+            reference_truth.add(item)
+
+        with tempfile.TemporaryDirectory() as directory:
+            cms, truth = SlidingCountMinSketch(width=40, depth=3), DecayingTruth(window_size=120)
+            checkpoint = Checkpoint(directory)
+            for position, item in enumerate(items[:2500], start=1):
+                cms.add(item)
+                truth.add(item)
+                if position % 1000 == 0:
+                    checkpoint.save(cms, truth, position, position * 10)
+
+            resumed = SlidingCountMinSketch(width=40, depth=3)
+            resumed_truth, stream_position, results_size = Checkpoint(directory).load(resumed)
+            self.assertEqual((stream_position, results_size), (2000, 20000))
+            for item in items[stream_position:]:
+                resumed.add(item)
+                resumed_truth.add(item)
+
+            np.testing.assert_array_equal(resumed.counters, reference.counters)
+            self.assertEqual(resumed.scan_pointer, reference.scan_pointer)
+            self.assertEqual(resumed.totalCount, reference.totalCount)
+            self.assertEqual(resumed_truth.get_all(), reference_truth.get_all())
+
+            with self.assertRaises(ValueError):
+                Checkpoint(directory).load(SlidingCountMinSketch(width=40, depth=4))
+            with self.assertRaises(ValueError):
+                Checkpoint(directory).load(CountMinSketch(width=40, depth=3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+import numpy as np
+from visualization.downsampling import DownsampleCache, bucket_width, downsample_minmax, minmax_buckets
+
+
+class TestDownsampling(unittest.TestCase):
+    def test_budget_and_spikes(self):
+        x = np.arange(10000)
+        y = np.random.default_rng(0).random(10000)
+        y[1234], y[8765] = 100.0, -100.0
+
+        dx, dy = downsample_minmax(x, y, 500)
+        self.assertLessEqual(len(dx), 500)
+        self.assertTrue(np.all(np.diff(dx) > 0))
+        self.assertIn(1234, dx)
+        self.assertIn(8765, dx)
+        np.testing.assert_array_equal(dy, y[dx])
+
+    def test_short_series_unchanged(self):
+        dx, dy = downsample_minmax([1, 2, 3], [3.0, 1.0, 2.0], 10)
+        self.assertEqual(list(dx), [1, 2, 3])
+        self.assertEqual(list(dy), [3.0, 1.0, 2.0])
+
+    def test_appended_buckets(self):
+        x = np.arange(25)
+        y = np.random.default_rng(1).random(25)
+        dx, dy = minmax_buckets(x, y, 4)
+        self.assertLessEqual(len(dx), 12)
+        self.assertLess(dx.max(), 24)  # the incomplete last bucket is left out
+        for start in range(0, 24, 4):
+            self.assertIn(start + y[start:start + 4].argmax(), dx)
+        np.testing.assert_array_equal(minmax_buckets(x, y, 1)[0], x)
+        self.assertEqual((bucket_width(1000, 1000), bucket_width(1001, 1000), bucket_width(5000, 1000)), (1, 3, 10))
+
+    def test_cache_recomputes_only_when_series_grows(self):
+        cache = DownsampleCache()
+        first = cache.get("run", list(range(50)), list(range(50)), 10)
+        self.assertIs(cache.get("run", list(range(50)), list(range(50)), 10), first)
+        self.assertIsNot(cache.get("run", list(range(60)), list(range(60)), 10), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
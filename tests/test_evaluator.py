@@ -0,0 +1,72 @@
+import os
+import tempfile
+import time
+import unittest
+from ground_truth.truth import Truth
+from persistence.checkpoint import Checkpoint
+from persistence.results_log import read_results_from
+from simulation.simulation import Evaluator
+from summarization_algorithms.count_min_sketch import CountMinSketch
+
+
+class SlowTruth(Truth):
+    def add_many(self, items):
+        time.sleep(0.2)
+        super().add_many(items)
+
+
+class RecordingCheckpoint(Checkpoint):
+    def save(self, cms, ground_truth, stream_position, results_size):
+        super().save(cms, ground_truth, stream_position, results_size)
+        with open(os.path.join(self.directory, "saves.txt"), "a") as f:
+            f.write(f"{stream_position}\n")
+
+
+class TestEvaluator(unittest.TestCase):
+    def run_evaluator(self, truth, policy, batches, max_pending=2, checkpoint_interval=None, directory=None):
+        """
+        Submit `batches` of a wide sketch to an evaluator and return it with the recorded results.
+        With `directory`, checkpoints are saved there.
+        """
+        cms = CountMinSketch(width=1000, depth=3, hash_family="multiply_shift")
+        checkpoint = RecordingCheckpoint(directory) if directory else None
+        with tempfile.TemporaryDirectory() as results_directory:
+            results_file = os.path.join(results_directory, "results.jsonl")
+            evaluator = Evaluator(truth, results_file, None, checkpoint, vis_interval=10 ** 9, max_pending=max_pending,
+                                  policy=policy, checkpoint_interval=checkpoint_interval)
+            for i, batch in enumerate(batches):
+                cms.add_many(batch)
+                evaluator.submit(cms, batch, final=i == len(batches) - 1)
+            evaluator.close()
+            return evaluator, read_results_from(results_file)[0]
+
+    def test_results_are_recorded_in_order(self):
+        batches = [[i % 7, i % 5, i] for i in range(20)]
+        evaluator, results = self.run_evaluator(Truth(), "block", batches)
+        self.assertEqual(evaluator.dropped, 0)
+        self.assertEqual([result["processed_items"] for result in results], list(range(3, 61, 3)))
+        self.assertTrue(all(result["exact_match_percentage"] == 100 for result in results))
+        self.assertTrue(all(0 <= result["snapshot_time"] < 1 for result in results))
+
+    def test_drop_policy_carries_items_over(self):
+        """
+        Dropped evaluations are skipped, but their items still reach the ground truth:
+        the final evaluation finds it in step with the sketch.
+        """
+        batches = [[i, i + 1] for i in range(10)]
+        evaluator, results = self.run_evaluator(SlowTruth(), "drop", batches, max_pending=1)
+        self.assertGreater(evaluator.dropped, 0)
+        self.assertEqual(len(results), len(batches) - evaluator.dropped)
+        self.assertEqual(results[-1]["processed_items"], 20)
+        self.assertEqual(results[-1]["exact_match_percentage"], 100)
+
+    def test_checkpoint_interval(self):
+        batches = [[i, i + 1] for i in range(10)]
+        with tempfile.TemporaryDirectory() as directory:
+            self.run_evaluator(Truth(), "block", batches, checkpoint_interval=7, directory=directory)
+            with open(os.path.join(directory, "saves.txt")) as f:
+                self.assertEqual([int(line) for line in f], [8, 14, 20])
+
+
+if __name__ == '__main__':
+    unittest.main()
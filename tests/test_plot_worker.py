@@ -0,0 +1,32 @@
+import multiprocessing
+import os
+import tempfile
+import unittest
+from persistence.results_log import append_result
+from visualization.plot_worker import PlotWorker, request_plots
+
+
+class TestPlotRequests(unittest.TestCase):
+    def test_requests_coalesce_without_blocking(self):
+        requests = multiprocessing.Queue(1)
+        for _ in range(5):
+            request_plots(requests)  # would block on the full queue if requests were not coalesced
+        self.assertFalse(requests.get(timeout=5))
+
+    def test_failed_renders_do_not_stop_the_worker(self):
+        """
+        Rendering into a missing directory fails (as does a missing matplotlib); the worker must
+        keep taking requests and still finish on the final one.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            results_file = os.path.join(directory, "results.jsonl")
+            append_result(results_file, {"processed_items": 1})
+            worker = PlotWorker(results_file, os.path.join(directory, "missing", "plots"))
+            for _ in range(5):
+                request_plots(worker.requests)
+            worker.close()
+            self.assertEqual(worker.process.exitcode, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import json
+import os
+import tempfile
+import unittest
+from persistence.results_log import ResultsReader, append_result, convert_to_json, load_results, truncate_results
+
+
+class TestResultsLog(unittest.TestCase):
+    def test_incremental_reads_and_conversion(self):
+        with tempfile.TemporaryDirectory() as directory:
+            log_path = os.path.join(directory, "results.jsonl")
+            reader = ResultsReader(log_path)
+            self.assertEqual(reader.read_new(), [])
+
+            sizes = [append_result(log_path, {"processed_items": n}) for n in (2000, 4000)]
+            self.assertEqual(reader.read_new(), [{"processed_items": 2000}, {"processed_items": 4000}])
+
+            # A record still being written is left for the next read
+            with open(log_path, "a") as f:
+                f.write('{"processed_items": 60')
+            self.assertEqual(reader.read_new(), [])
+            with open(log_path, "a") as f:
+                f.write('00}\n')
+            self.assertEqual(reader.read_new(), [{"processed_items": 6000}])
+
+            # Truncating back to a checkpoint makes the reader start over
+            truncate_results(log_path, sizes[0])
+            self.assertEqual(reader.read_new(), [{"processed_items": 2000}])
+            self.assertEqual(reader.records, load_results(log_path))
+
+            json_path = os.path.join(directory, "results.json")
+            convert_to_json(log_path, json_path)
+            with open(json_path) as f:
+                self.assertEqual(json.load(f), [{"processed_items": 2000}])
+
+    def test_replaced_and_rewritten_logs_are_read_again(self):
+        with tempfile.TemporaryDirectory() as directory:
+            log_path = os.path.join(directory, "results.jsonl")
+            reader = ResultsReader(log_path)
+            append_result(log_path, {"processed_items": 2000})
+            reader.read_new()
+
+            # Replaced by a longer log of a new run
+            new_path = os.path.join(directory, "new.jsonl")
+            for n in (1000, 2000, 3000):
+                append_result(new_path, {"processed_items": n})
+            os.replace(new_path, log_path)
+            self.assertEqual([r["processed_items"] for r in reader.read_new()], [1000, 2000, 3000])
+
+            # Rewritten in place with the same first record: the offset falls inside a record
+            with open(log_path, "w") as f:
+                f.write(json.dumps({"processed_items": 1000}) + "\n")
+                f.write(json.dumps({"processed_items": 2000, "snapshot_time": 0.25}) + "\n")
+                f.write(json.dumps({"processed_items": 3000, "snapshot_time": 0.5}) + "\n")
+            self.assertEqual([r["processed_items"] for r in reader.read_new()], [1000, 2000, 3000])
+            self.assertEqual(reader.records, load_results(log_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+import numpy as np
+from simulation.simulation import get_algorithm, simulate_sharded
+
+
+class RecordingEvaluator:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, cms, items, final=False):
+        self.submitted.append((cms.totalCount, len(items)))
+
+
+class TestShardedIngestion(unittest.TestCase):
+    def setUp(self):
+        items = np.random.default_rng(4).zipf(1.3, size=1_000_000).astype(np.int64)
+        self.batches = [items[start:start + 2000] for start in range(0, len(items), 2000)]
+        self.config = {"eval_interval": 2000, "merge_interval": 20000, "hash_family": "multiply_shift"}
+
+    def sketch(self, algorithm="CountMinSketch"):
+        return get_algorithm(algorithm, 1000, 4, "multiply_shift")
+
+    def test_matches_single_process(self):
+        for algorithm in ("CountMinSketch", "CountMeanMinSketch", "CountSketch"):
+            single, sharded = self.sketch(algorithm), self.sketch(algorithm)
+            for batch in self.batches[:40]:
+                single.add_many(batch)
+            evaluator = RecordingEvaluator()
+            last = simulate_sharded(sharded, iter(self.batches[:40] + [["apple"]]), evaluator, 3, algorithm,
+                                    self.config)
+            single.add_many(["apple"])
+            np.testing.assert_array_equal(sharded.counters, single.counters)
+            self.assertEqual(sharded.totalCount, single.totalCount)
+            # One evaluation per merge, the last chunk is left for the final one
+            self.assertEqual(evaluator.submitted, [(n, 20000) for n in range(20000, 80001, 20000)])
+            self.assertEqual(len(last), 1)
+
+    def test_long_stream(self):
+        """
+        Many pipelined chunks through two workers add up to the single-process sketch.
+        The throughput is measured by benchmarks/sharding_throughput.py.
+        """
+        single, sharded = self.sketch(), self.sketch()
+        for batch in self.batches:
+            single.add_many(batch)
+        simulate_sharded(sharded, iter(self.batches), RecordingEvaluator(), 2, "CountMinSketch", self.config)
+        np.testing.assert_array_equal(sharded.counters, single.counters)
+        self.assertEqual(sharded.totalCount, single.totalCount)
+
+
+if __name__ == '__main__':
+    unittest.main()
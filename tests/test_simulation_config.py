@@ -0,0 +1,26 @@
+import unittest
+from ground_truth.decaying_truth import DecayingTruth
+from ground_truth.truth import Truth
+from simulation.simulation import apply_arguments, build_parser, get_truth_class
+
+
+class TestCommandLine(unittest.TestCase):
+    def config_for(self, *argv):
+        config = {"algorithm": "CountMinSketch", "dataset_name": "FIFA.csv", "width": 100, "depth": 5}
+        return apply_arguments(config, build_parser().parse_args(list(argv)))
+
+    def test_algorithm_selects_the_truth(self):
+        """
+        The --algorithm flag, not the algorithm of config.json, decides which truth the sketch is scored against.
+        """
+        config = self.config_for("--algorithm", "CompactExpCountMinSketch", "--dataset", "synthetic", "--width", "20")
+        self.assertEqual((config["algorithm"], config["dataset_name"], config["width"]),
+                         ("CompactExpCountMinSketch", "synthetic", 20))
+        truth = get_truth_class(config)
+        self.assertIsInstance(truth, DecayingTruth)
+        self.assertEqual(truth.window_size, 20 * 5)
+        self.assertIs(type(get_truth_class(self.config_for("--algorithm", "CountMinSketch", "--dataset", "x"))), Truth)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,294 @@
+import unittest
+import numpy as np
+from summarization_algorithms.count_min_sketch import CountMinSketch
+from summarization_algorithms.conservative_count_min_sketch import ConservativeCountMinSketch
+from summarization_algorithms.count_mean_min_sketch import CountMeanMinSketch
+from summarization_algorithms.count_sketch import CountSketch
+from summarization_algorithms.sliding_count_min_sketch import SlidingCountMinSketch
+from summarization_algorithms.compact_exp_count_min_sketch import CompactExpCountMinSketch
+from summarization_algorithms.hashing import HASH_FAMILIES, get_hash_family
+
+
+class TestBatchAPI(unittest.TestCase):
+    def setUp(self):
+        """
+        Setup a Zipf stream with plenty of duplicate keys and a few string keys.
+        """
+        rng = np.random.default_rng(7)
+        self.items = rng.zipf(1.3, size=3000).tolist() + ["apple", "banana", "apple"]
+        self.counts = rng.integers(1, 4, size=len(self.items))
+
+    def assert_batch_matches_sequential(self, factory, counts=None):
+        sequential, batched = factory(), factory()
+        for item, count in zip(self.items, counts if counts is not None else [1] * len(self.items)):
+            sequential.add(item, int(count))
+        batched.add_many(self.items, counts)
+
+        np.testing.assert_array_equal(batched.counters, sequential.counters)
+        self.assertEqual(batched.totalCount, sequential.totalCount)
+        keys = list(dict.fromkeys(self.items)) + ["missing"]
+        expected = [sequential.query(key) for key in keys]
+        np.testing.assert_allclose(batched.query_many(keys), expected)
+
+    def test_count_min_sketch(self):
+        self.assert_batch_matches_sequential(lambda: CountMinSketch(width=50, depth=4), self.counts)
+
+    def test_conservative_count_min_sketch(self):
+        """
+        A narrow sketch forces many collisions, so the order of conservative updates matters.
+        """
+        self.assert_batch_matches_sequential(lambda: ConservativeCountMinSketch(width=50, depth=4), self.counts)
+        self.assert_batch_matches_sequential(lambda: ConservativeCountMinSketch(width=7, depth=3))
+
+    def test_conservative_integer_array(self):
+        sequential = ConservativeCountMinSketch(width=30, depth=3, hash_family="multiply_shift")
+        batched = ConservativeCountMinSketch(width=30, depth=3, hash_family="multiply_shift")
+        items = np.random.default_rng(3).zipf(1.2, size=5000)
+        for item in items.tolist():
+            sequential.add(item)
+        for start in range(0, len(items), 1000):
+            batched.add_many(items[start:start + 1000])
+        np.testing.assert_array_equal(batched.counters, sequential.counters)
+
+    def test_conservative_narrow_sketch(self):
+        """
+        On a narrow sketch, the batch stops its rounds early and finishes item by item, saturating too.
+        """
+        items = np.random.default_rng(5).zipf(1.3, size=2000)
+        for counter_dtype in ("int64", "uint8"):
+            sequential = ConservativeCountMinSketch(width=10, depth=5, hash_family="multiply_shift",
+                                                    counter_dtype=counter_dtype)
+            batched = ConservativeCountMinSketch(width=10, depth=5, hash_family="multiply_shift",
+                                                 counter_dtype=counter_dtype)
+            for item in items.tolist():
+                sequential.add(item)
+            batched.add_many(items)
+            np.testing.assert_array_equal(batched.counters, sequential.counters)
+
+    def test_count_mean_min_sketch(self):
+        self.assert_batch_matches_sequential(lambda: CountMeanMinSketch(width=50, depth=4), self.counts)
+
+    def test_count_mean_min_row_sums(self):
+        cms = CountMeanMinSketch(width=50, depth=4)
+        cms.add_many(self.items, self.counts)
+        cms.add("apple", 5)
+        np.testing.assert_array_equal(cms.row_sums, cms.counters.sum(axis=1))
+
+    def test_count_sketch(self):
+        self.assert_batch_matches_sequential(lambda: CountSketch(width=50, depth=5), self.counts)
+
+    def test_sliding_count_min_sketch(self):
+        """
+        The window (width * depth slots) is much shorter than the stream, so the scan wraps many times.
+        """
+        self.assert_batch_matches_sequential(lambda: SlidingCountMinSketch(width=20, depth=3), self.counts)
+        self.assert_batch_matches_sequential(lambda: SlidingCountMinSketch(width=20, depth=3))
+
+
+class TestCounterDtypes(unittest.TestCase):
+    def test_small_dtypes_match_int64_below_the_limit(self):
+        items = np.random.default_rng(5).zipf(1.5, size=2000).tolist()
+        for factory in (CountMinSketch, ConservativeCountMinSketch, CountMeanMinSketch, SlidingCountMinSketch):
+            wide, compact = factory(width=40, depth=3), factory(width=40, depth=3, counter_dtype="uint16")
+            wide.add_many(items)
+            compact.add_many(items)
+            np.testing.assert_array_equal(compact.counters, wide.counters)
+            self.assertEqual(compact.get_memory_usage() * 4, wide.get_memory_usage())
+
+    def test_counters_saturate(self):
+        """
+        Counters stop at the largest value of the dtype instead of wrapping around.
+        """
+        for factory in (CountMinSketch, ConservativeCountMinSketch, CountMeanMinSketch):
+            per_item = factory(width=10, depth=2, counter_dtype="uint8")
+            batched = factory(width=10, depth=2, counter_dtype="uint8")
+            for _ in range(3):
+                per_item.add("apple", 100)
+            batched.add_many(["apple"] * 3, 100)
+            self.assertEqual(per_item.counters.max(), 255)
+            np.testing.assert_array_equal(batched.counters, per_item.counters)
+
+        cs = CountSketch(width=10, depth=3, counter_dtype="int32")
+        cs.add_many(["apple"] * 3, 2 ** 30)
+        self.assertTrue(np.isin(cs.counters[cs.counters != 0], [-2 ** 31, 2 ** 31 - 1]).all())
+        with self.assertRaises(ValueError):
+            CountSketch(width=10, depth=3, counter_dtype="uint16")
+        with self.assertRaises(ValueError):
+            CountMinSketch(width=10, depth=3, counter_dtype="float32")
+
+
+class TestMerge(unittest.TestCase):
+    def test_linear_sketches_merge_exactly(self):
+        items = np.random.default_rng(9).zipf(1.4, size=3000).tolist()
+        for factory in (CountMinSketch, CountMeanMinSketch, CountSketch):
+            whole, left, right = factory(width=60, depth=4), factory(width=60, depth=4), factory(width=60, depth=4)
+            whole.add_many(items)
+            left.add_many(items[:1200])
+            right.add_many(items[1200:])
+            merged = left + right
+            np.testing.assert_array_equal(merged.counters, whole.counters)
+            self.assertEqual(merged.totalCount, whole.totalCount)
+            np.testing.assert_array_equal(left.counters + right.counters, merged.counters)
+            if factory is CountMeanMinSketch:
+                np.testing.assert_array_equal(merged.row_sums, whole.row_sums)
+
+            sparse = factory(width=60, depth=4)
+            sparse.merge_sparse(left.to_sparse())
+            sparse.merge_sparse(right.to_sparse())
+            np.testing.assert_array_equal(sparse.counters, whole.counters)
+            self.assertEqual(sparse.totalCount, whole.totalCount)
+            self.assertEqual(sparse.query_many(items[:50]).tolist(), whole.query_many(items[:50]).tolist())
+
+    def test_conservative_merge_is_bounded(self):
+        """
+        The approximate merge never underestimates and never exceeds the regular sketch of both streams.
+        """
+        items = np.random.default_rng(9).zipf(1.4, size=3000).tolist()
+        left, right = ConservativeCountMinSketch(width=60, depth=4), ConservativeCountMinSketch(width=60, depth=4)
+        regular = CountMinSketch(width=60, depth=4)
+        regular.add_many(items)
+        left.add_many(items[:1200])
+        right.add_many(items[1200:])
+        left.merge(right)
+        keys, true_counts = np.unique(items, return_counts=True)
+        self.assertTrue((left.query_many(keys.tolist()) >= true_counts).all())
+        self.assertTrue((left.counters <= regular.counters).all())
+
+    def test_snapshot_is_frozen(self):
+        cms = CountMeanMinSketch(width=60, depth=4)
+        cms.add_many(["apple"] * 3)
+        snapshot = cms.snapshot()
+        cms.add_many(["apple", "banana"])
+        self.assertEqual(snapshot.counters.max(), 3)
+        self.assertEqual(snapshot.row_sums.tolist(), [3] * 4)
+        self.assertEqual(snapshot.totalCount, 3)
+
+    def test_incompatible_sketches(self):
+        cms = CountMinSketch(width=60, depth=4)
+        with self.assertRaises(ValueError):
+            cms.merge(CountMinSketch(width=60, depth=3))
+        with self.assertRaises(ValueError):
+            cms.merge(CountMinSketch(width=60, depth=4, hash_family="double"))
+        with self.assertRaises(TypeError):
+            cms.merge(CountSketch(width=60, depth=4))
+        with self.assertRaises(NotImplementedError):
+            SlidingCountMinSketch(width=60, depth=4).merge(SlidingCountMinSketch(width=60, depth=4))
+
+
+class TestSlidingCountMinSketch(unittest.TestCase):
+    @staticmethod
+    def reference_counters(width, depth, stream):
+        """
+        Replay the sliding sketch one arrival and one scanned slot at a time.
+        """
+        reference = SlidingCountMinSketch(width=width, depth=depth)
+        counters = np.zeros((depth, width, 2), dtype=int)
+        pointer = 0
+        for item, count in stream:
+            indices = reference._hash(item)
+            for _ in range(count):
+                d, w = divmod(pointer, width)
+                counters[d][w][1] = counters[d][w][0]
+                counters[d][w][0] = 0
+                pointer = (pointer + 1) % (width * depth)
+                for i, pos in enumerate(indices):
+                    counters[i][pos][0] += 1
+        return counters, pointer
+
+    def test_bulk_counts_match_unit_arrivals(self):
+        """
+        Counts larger than the whole window must still behave like that many single arrivals.
+        """
+        stream = [("apple", 1), ("banana", 7), ("apple", 40), ("cherry", 3), ("banana", 1), ("ginger", 95)]
+        expected, pointer = self.reference_counters(6, 3, stream)
+
+        per_item = SlidingCountMinSketch(width=6, depth=3)
+        for item, count in stream:
+            per_item.add(item, count)
+        batched = SlidingCountMinSketch(width=6, depth=3)
+        batched.add_many([item for item, _ in stream], [count for _, count in stream])
+
+        for sketch in (per_item, batched):
+            np.testing.assert_array_equal(sketch.counters, expected)
+            self.assertEqual(sketch.scan_pointer, pointer)
+            self.assertEqual(sketch.totalCount, sum(count for _, count in stream))
+
+
+class TestCompactExpCountMinSketch(unittest.TestCase):
+    def test_window_estimates(self):
+        """
+        Only the last `window_size` arrivals count, up to the error of the oldest bucket.
+        """
+        cms = CompactExpCountMinSketch(width=200, depth=3, window_size=100, counter_size=16)
+        for item in ["apple"] * 150 + ["banana"] * 60:
+            cms.add(item)
+        self.assertAlmostEqual(cms.query("apple"), 40, delta=20)
+        self.assertAlmostEqual(cms.query("banana"), 60, delta=30)
+        self.assertEqual(cms.query("cherry"), 0)
+        np.testing.assert_array_equal(cms.query_many(["apple", "banana", "cherry"]),
+                                      [cms.query("apple"), cms.query("banana"), 0])
+
+        for _ in range(100):
+            cms.add("cherry")
+        self.assertEqual(cms.query("apple"), 0)
+
+
+class TestHashFamilies(unittest.TestCase):
+    def test_batched_hashing_matches_per_item(self):
+        """
+        Every family must map an item to the same columns and signs with and without batching.
+        """
+        items = list(range(200)) + ["apple", "banana", 3.5]
+        for name in HASH_FAMILIES:
+            family = get_hash_family(name, seed=11)
+            indices = family.indices_many(items, 5, 997)
+            signs = family.signs_many(items, 5)
+            for j, item in enumerate(items):
+                self.assertEqual(indices[:, j].tolist(), family.indices(item, 5, 997))
+                self.assertEqual(signs[:, j].tolist(), family.signs(item, 5))
+                self.assertEqual(family.indices_and_signs(item, 5, 997), (indices[:, j].tolist(), signs[:, j].tolist()))
+            both = family.indices_and_signs_many(items, 5, 997)
+            np.testing.assert_array_equal(both[0], indices)
+            np.testing.assert_array_equal(both[1], signs)
+            self.assertTrue(((indices >= 0) & (indices < 997)).all())
+            self.assertTrue(set(np.unique(signs)) <= {-1, 1})
+
+    def test_integer_arrays_hash_like_integers(self):
+        """
+        The vectorized integer path must agree with hashing the same integers one by one.
+        """
+        keys = np.array([0, 1, 2, 10 ** 12, -5, 2 ** 63 - 1], dtype=np.int64)
+        for name in HASH_FAMILIES:
+            family = get_hash_family(name)
+            np.testing.assert_array_equal(family.indices_many(keys, 4, 1000),
+                                          family.indices_many(keys.tolist(), 4, 1000))
+            np.testing.assert_array_equal(family.signs_many(keys, 4), family.signs_many(keys.tolist(), 4))
+
+    def test_multiply_shift_hashes_an_item_once(self):
+        family = get_hash_family("multiply_shift", seed=3)
+        calls = []
+        base_hashes = family._key_hash._base_hashes
+        family._key_hash._base_hashes = lambda x: calls.append(x) or base_hashes(x)
+        self.assertEqual(family.indices_and_signs("apple", 4, 100),
+                         (family.indices("apple", 4, 100), family.signs("apple", 4)))
+        self.assertEqual(calls, ["apple"] * 3)  # once for the pair, once each for indices and signs
+
+    def test_multiply_shift_signs_use_high_key_bits(self):
+        """
+        Keys that only differ above bit 32 must not share their signs in every row.
+        """
+        family = get_hash_family("multiply_shift", seed=3)
+        keys = (np.arange(1, 2001, dtype=np.uint64) << np.uint64(32)) | np.uint64(12345)
+        signs = family.signs_many(keys, 4)
+        self.assertTrue((signs != signs[:, :1]).any(axis=1).all())
+        self.assertLess(abs(signs.mean()), 0.1)
+
+    def test_sketches_accept_any_family(self):
+        for name in HASH_FAMILIES:
+            cms = CountMinSketch(width=100, depth=4, hash_family=name)
+            cms.add_many(["apple"] * 3 + ["banana"])
+            self.assertGreaterEqual(cms.query("apple"), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
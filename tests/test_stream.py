@@ -0,0 +1,229 @@
+import bz2
+import csv
+import gzip
+import lzma
+import os
+import tempfile
+import unittest
+from itertools import chain
+import numpy as np
+import input_stream.dataset_stream_simulator as dataset_stream_simulator
+import input_stream.int_tokenizer as int_tokenizer
+from input_stream.dataset_stream_simulator import DatasetStreamSimulator
+from input_stream.dataset_cache import cache_paths, load_vocabulary
+from input_stream.int_tokenizer import iter_int_chunks, line_aligned_ranges, load_int_tokens, read_int_tokens
+from input_stream.random_stream_simulator import RandomStreamSimulator
+from input_stream.stream_simulator_base import Pacer, prefetch_blocks
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestStreamBatches(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.words = [f"w{i % 37}" for i in range(5000)]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def check_batches(self, simulator, expected):
+        self.assertEqual(list(simulator.simulate_stream()), expected)
+        for batch_size, skip in ((100, 0), (64, 250), (10 ** 6, 3)):
+            batches = list(simulator.simulate_batches(batch_size, skip=skip))
+            self.assertTrue(all(len(batch) == batch_size for batch in batches[:-1]))
+            self.assertEqual(list(chain.from_iterable(batches)), expected[skip:])
+
+    def test_txt_blocks_do_not_split_tokens(self):
+        path = os.path.join(self.directory.name, "stream.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            for start in range(0, len(self.words), 7):
+                f.write(" ".join(self.words[start:start + 7]) + "\n")
+        original = dataset_stream_simulator.READ_BUFFER_SIZE
+        dataset_stream_simulator.READ_BUFFER_SIZE = 100  # many tokens straddle two blocks
+        try:
+            self.check_batches(DatasetStreamSimulator(path, None, sleep_time=0), self.words)
+        finally:
+            dataset_stream_simulator.READ_BUFFER_SIZE = original
+
+    def test_csv_reads_only_the_field(self):
+        path = os.path.join(self.directory.name, "stream.csv")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["id", "Tweet", "other"])
+            for start in range(0, len(self.words), 5):
+                writer.writerow([start, " ".join(self.words[start:start + 5]), "ignored words"])
+            writer.writerow([len(self.words), "", "ignored"])
+        self.check_batches(DatasetStreamSimulator(path, "Tweet", sleep_time=0), self.words)
+        with self.assertRaises(ValueError):
+            list(DatasetStreamSimulator(path, "Missing", sleep_time=0).simulate_batches(10))
+
+    def test_compressed_datasets(self):
+        text = "\n".join(" ".join(self.words[start:start + 9]) for start in range(0, len(self.words), 9)) + "\n"
+        numbers = [str(i * 7919 % 1000) for i in range(len(self.words))]
+        for module, ext in ((gzip, ".gz"), (bz2, ".bz2"), (lzma, ".xz")):
+            path = os.path.join(self.directory.name, "stream.txt" + ext)
+            with module.open(path, "wt", encoding="utf-8") as f:
+                f.write(text)
+            self.check_batches(DatasetStreamSimulator(path, None, sleep_time=0), self.words)
+
+            path = os.path.join(self.directory.name, "numbers.txt" + ext)
+            with module.open(path, "wt", encoding="utf-8") as f:
+                f.write(" ".join(numbers))
+            simulator = DatasetStreamSimulator(path, None, sleep_time=0, numeric=True)
+            self.assertEqual(np.concatenate(list(simulator.simulate_batches(100))).tolist(), list(map(int, numbers)))
+
+    def test_prefetch_raises_reader_errors(self):
+        def blocks():
+            yield [1, 2]
+            raise ValueError("corrupt input")
+
+        prefetched = prefetch_blocks(blocks())
+        self.assertEqual(next(prefetched), [1, 2])
+        with self.assertRaises(ValueError):
+            next(prefetched)
+
+    def test_random_stream(self):
+        simulator = RandomStreamSimulator(sleep_time=0, stream_size=1000, seed=3)
+        self.check_batches(simulator, list(simulator.simulate_stream()))
+
+    def test_random_distributions(self):
+        for distribution in ("zipf", "uniform", "drifting_zipf", "bursty"):
+            simulator = RandomStreamSimulator(sleep_time=0, stream_size=5000, seed=7, distribution=distribution,
+                                              vocabulary_size=100, chunk_size=512, burst_interval=1000,
+                                              burst_length=100)
+            items = np.concatenate(list(simulator.simulate_batches(300)))
+            self.assertEqual(items.dtype, np.int64)
+            self.assertEqual(len(items), 5000)
+            self.assertTrue(np.array_equal(items, np.concatenate(list(simulator.simulate_batches(1000)))))
+            upper = 105 if distribution == "bursty" else 100  # one new item per burst
+            self.assertTrue(items.min() >= 1 and items.max() <= upper, distribution)
+
+    def test_endless_random_stream(self):
+        batches = RandomStreamSimulator(sleep_time=0, stream_size=None, seed=7, chunk_size=100).simulate_batches(64)
+        self.assertEqual(sum(len(next(batches)) for _ in range(50)), 3200)
+
+    def test_cached_token_ids(self):
+        path = os.path.join(self.directory.name, "stream.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(" ".join(self.words) + "\n")
+        simulator = DatasetStreamSimulator(path, None, sleep_time=0, use_cache=True)
+        batches = list(simulator.simulate_batches(300, skip=7))
+        self.assertTrue(all(batch.dtype == np.uint32 for batch in batches))
+        vocabulary = load_vocabulary(path)
+        self.assertEqual([vocabulary[i] for i in np.concatenate(batches).tolist()], self.words[7:])
+
+        # A fresh cache is reused as is; a changed source recompiles it
+        ids_path = cache_paths(path)[0]
+        compiled_at = os.stat(ids_path).st_mtime_ns
+        simulator.compile_cache()
+        self.assertEqual(os.stat(ids_path).st_mtime_ns, compiled_at)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("new words\n")
+        ids = simulator.compile_cache()
+        self.assertEqual([load_vocabulary(path)[i] for i in ids[-2:].tolist()], ["new", "words"])
+
+
+class TestPacer(unittest.TestCase):
+    def test_rate_with_drift_correction(self):
+        clock = FakeClock()
+        pacer = Pacer(rate=1000, clock=clock, sleep=clock.sleep)
+        pacer.wait(100)
+        self.assertAlmostEqual(clock.now, 0.1)
+        clock.now += 0.05  # the consumer took half of the next batch interval
+        pacer.wait(100)
+        self.assertAlmostEqual(clock.now, 0.2)  # the lost time is made up, not added
+        self.assertEqual(pacer.stats(), {"target_rate": 1000, "achieved_rate": 1000.0})
+
+    def test_bucket_caps_catch_up(self):
+        clock = FakeClock()
+        pacer = Pacer(rate=1000, burst=100, clock=clock, sleep=clock.sleep)
+        pacer.wait(1)
+        clock.now += 10  # long stall
+        for _ in range(3):
+            pacer.wait(50)
+        self.assertAlmostEqual(clock.now, 10.051)  # only 100 items are released without waiting
+
+    def test_unpaced_and_replay(self):
+        clock = FakeClock()
+        pacer = Pacer(rate=0, clock=clock, sleep=clock.sleep)
+        pacer.wait(10 ** 6)
+        self.assertEqual(clock.sleeps, [])
+
+        pacer = Pacer(speedup=2.0, clock=clock, sleep=clock.sleep)
+        for timestamp in (100.0, 104.0, 110.0):
+            pacer.wait_until(timestamp)
+        self.assertAlmostEqual(clock.now, 5.0)
+
+    def test_csv_timestamp_replay(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "stream.csv")
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["Date", "Tweet"])
+                writer.writerows([["2018-06-14 10:00:00", "a b"], ["2018-06-14 10:00:30", "c"],
+                                  ["2018-06-14 10:01:00", "d e f"]])
+            simulator = DatasetStreamSimulator(path, "Tweet", timestamp_field="Date", speedup=60.0)
+            clock = FakeClock()
+            simulator.pacer.clock, simulator.pacer.sleep = clock, clock.sleep
+            self.assertEqual(list(simulator.simulate_batches(3)), [["a", "b", "c"], ["d", "e", "f"]])
+            self.assertAlmostEqual(clock.now, 1.0)
+
+
+class TestIntTokenizer(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "transactions.txt")
+        rng = np.random.default_rng(0)
+        self.lines = [rng.integers(0, 10 ** 9, size=rng.integers(0, 12)).tolist() for _ in range(2000)]
+        with open(self.path, "w") as f:
+            f.write("\n".join(" ".join(map(str, line)) for line in self.lines) + "\n \n")
+        self.expected = list(chain.from_iterable(self.lines))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_chunks_and_ranges(self):
+        self.assertEqual(read_int_tokens(self.path).tolist(), self.expected)
+        self.assertEqual(np.concatenate(list(iter_int_chunks(self.path, chunk_size=100))).tolist(), self.expected)
+        ranges = line_aligned_ranges(self.path, 7)
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], os.path.getsize(self.path))
+        parts = [read_int_tokens(self.path, start, end) for start, end in ranges]
+        self.assertEqual(np.concatenate(parts).tolist(), self.expected)
+        self.assertEqual(load_int_tokens(self.path, workers=2).tolist(), self.expected)
+
+    def test_ranges_with_a_narrow_newline_window(self):
+        expected = line_aligned_ranges(self.path, 7)
+        original = int_tokenizer.NEWLINE_WINDOW
+        int_tokenizer.NEWLINE_WINDOW = 1  # most searches widen the window several times
+        try:
+            self.assertEqual(line_aligned_ranges(self.path, 7), expected)
+        finally:
+            int_tokenizer.NEWLINE_WINDOW = original
+
+    def test_numeric_batches(self):
+        simulator = DatasetStreamSimulator(self.path, None, sleep_time=0, numeric=True)
+        batches = list(simulator.simulate_batches(500, skip=10))
+        self.assertTrue(all(isinstance(batch, np.ndarray) and batch.dtype == np.int64 for batch in batches))
+        self.assertEqual(np.concatenate(batches).tolist(), self.expected[10:])
+
+    def test_rejects_non_integer_tokens(self):
+        with open(self.path, "a") as f:
+            f.write("12 abc\n")
+        with self.assertRaises(ValueError):
+            read_int_tokens(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
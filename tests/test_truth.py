@@ -0,0 +1,64 @@
+import unittest
+import numpy as np
+from ground_truth.truth import Truth
+from ground_truth.decaying_truth import DecayingTruth
+
+
+class TestTruthSnapshot(unittest.TestCase):
+    def test_snapshot_is_frozen(self):
+        """
+        Later additions and window expiries must not show through a snapshot.
+        """
+        for truth in (Truth(), DecayingTruth(window_size=4)):
+            for item in ["apple", "banana", "apple", "cherry"]:
+                truth.add(item)
+            expected = truth.get_all()
+            snapshot = truth.snapshot()
+            for item in ["apple", "ginger", "ginger", "banana"]:
+                truth.add(item)
+
+            self.assertEqual(dict(snapshot), expected)
+            self.assertEqual(len(snapshot), len(expected))
+            self.assertNotIn("ginger", snapshot)
+            self.assertNotEqual(truth.get_all(), expected)
+
+            truth.snapshot()
+            with self.assertRaises(RuntimeError):
+                snapshot["apple"]
+
+
+class TestTruthAddMany(unittest.TestCase):
+    def test_add_many_matches_add(self):
+        items = np.random.default_rng(1).integers(0, 50, size=500)
+        for truth_class in (Truth, lambda: DecayingTruth(window_size=100)):
+            expected = truth_class()
+            for item in items.tolist():
+                expected.add(item)
+            for batch in (items, items.tolist()):
+                truth = truth_class()
+                truth.add_many(batch[:250])
+                truth.add_many(batch[250:])
+                self.assertEqual(truth.get_all(), expected.get_all())
+
+
+class TestTruthSampling(unittest.TestCase):
+    def test_tracked_keys_follow_the_window(self):
+        """
+        The key list and the heavy hitters must stay in sync with the counts as keys leave the window.
+        """
+        truth = DecayingTruth(window_size=300, heavy_threshold=20)
+        for item in np.random.default_rng(6).zipf(1.3, size=3000).tolist():
+            truth.add(item)
+        self.assertEqual(sorted(truth._keys), sorted(truth.counts))
+        self.assertEqual(truth._heavy, {item for item, count in truth.counts.items() if count >= 20})
+
+        heavy, tail, tail_size = truth.sample_keys(10, 20, np.random.default_rng(0))
+        self.assertEqual(set(heavy), truth._heavy)
+        self.assertEqual(len(tail), 10)
+        self.assertEqual(len(set(tail)), 10)
+        self.assertTrue(all(truth.counts[item] < 20 for item in tail))
+        self.assertEqual(tail_size, len(truth.counts) - len(heavy))
+
+
+if __name__ == '__main__':
+    unittest.main()
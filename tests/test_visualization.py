@@ -0,0 +1,33 @@
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+
+
+@unittest.skipIf(importlib.util.find_spec("matplotlib") is None, "matplotlib is not installed")
+class TestVisualize(unittest.TestCase):
+    def test_legacy_results(self):
+        """
+        A legacy results.json predates snapshot_time: its other plots are still rendered.
+        """
+        from visualization.visualization import visualize
+
+        record = {"processed_items": 2000, "avg_error": 1.0, "avg_error_percentage": 5.0,
+                  "overestimation_percentage": 10.0, "underestimation_percentage": 0.0,
+                  "exact_match_percentage": 90.0, "avg_query_time": 1e-6, "memory_usage": 4000.0,
+                  "load_factor": 0.5,
+                  "percentiles": {category: {"50th": 0.0, "90th": 1.0, "95th": 2.0, "100th": 3.0}
+                                  for category in ("overestimation", "underestimation", "combined")}}
+        with tempfile.TemporaryDirectory() as directory:
+            results_file = os.path.join(directory, "results.json")
+            with open(results_file, "w") as f:
+                json.dump([record, dict(record, processed_items=4000)], f)
+            visualize(results_file, directory)
+            self.assertTrue(os.path.exists(os.path.join(directory, "avg_error.png")))
+            self.assertTrue(os.path.exists(os.path.join(directory, "combined_percentiles.png")))
+            self.assertFalse(os.path.exists(os.path.join(directory, "snapshot_time.png")))
+
+
+if __name__ == '__main__':
+    unittest.main()
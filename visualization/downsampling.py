@@ -0,0 +1,80 @@
+"""
+downsampling.py
+
+Min/max bucketing of long metric series, shared by the dashboard and the static plots.
+
+A series longer than the point budget is split into budget // 2 buckets of consecutive points, and only
+the lowest and the highest point of every bucket are kept, in their original order. Spikes (such as the
+100th error percentile jumping for a single evaluation) therefore always survive, unlike with
+decimation or averaging.
+
+A graph that grows in place (the dashboard) is downsampled from scratch only when its series has doubled
+since the last time. In between, new points are appended in buckets of the width given by `bucket_width`,
+so the graph holds at most twice the budget and the cost of downsampling stays proportional to the points
+appended.
+"""
+import numpy as np
+
+DEFAULT_MAX_POINTS = 1000
+
+
+def downsample_minmax(x, y, max_points=DEFAULT_MAX_POINTS):
+    """
+    Return (x, y) reduced to at most `max_points` points (at least 2) by min/max bucketing.
+    Series that already fit are returned unchanged.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    max_points = max(max_points, 2)
+    if n <= max_points:
+        return x, y
+
+    n_buckets = max_points // 2
+    starts = np.arange(n_buckets) * n // n_buckets
+    bucket_ids = np.repeat(np.arange(n_buckets), np.diff(np.append(starts, n)))
+    # Sorting by bucket, then by value, puts the minimum of each bucket at its start and the maximum at its end
+    order = np.lexsort((y, bucket_ids))
+    ends = np.append(starts[1:], n) - 1
+    keep = np.unique(np.concatenate([order[starts], order[ends]]))
+    return x[keep], y[keep]
+
+
+def bucket_width(n_points, max_points=DEFAULT_MAX_POINTS):
+    """
+    Return the width of the buckets appended to a series that was downsampled at `n_points` points:
+    1 (every point) if it fitted, otherwise the width of its min/max buckets, rounded up.
+    """
+    if n_points <= max_points:
+        return 1
+    return -(-n_points // (max(max_points, 2) // 2))
+
+
+def minmax_buckets(x, y, width):
+    """
+    Return the lowest and the highest point of every complete bucket of `width` consecutive points of
+    (x, y), in their original order. Points after the last complete bucket are left out.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    n = len(y) // width * width
+    buckets = y[:n].reshape(-1, width)
+    offsets = np.arange(len(buckets)) * width
+    keep = np.unique(np.concatenate([offsets + buckets.argmin(axis=1), offsets + buckets.argmax(axis=1)]))
+    return x[keep], y[keep]
+
+
+class DownsampleCache:
+    """
+    Downsampled series by key (e.g. run and metric), recomputed only when the series grew or the budget
+    changed, so repeated refreshes of an unchanged run cost nothing.
+    """
+    def __init__(self):
+        self._entries = {}
+
+    def get(self, key, x, y, max_points=DEFAULT_MAX_POINTS):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != (len(x), max_points):
+            entry = ((len(x), max_points), downsample_minmax(x, y, max_points))
+            self._entries[key] = entry
+        return entry[1]
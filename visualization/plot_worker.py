@@ -0,0 +1,93 @@
+"""
+plot_worker.py
+
+Background process rendering the PNG plots of a run while the simulation goes on.
+
+Render requests never wait: the request queue holds a single pending request, and a request arriving
+while one is pending is dropped, since the pending render will read the newer results anyway. The
+worker reads only the records appended to the results log since its previous render and keeps a
+single `PlotRenderer`, so its figures are reused rather than recreated. matplotlib is only imported
+in the worker process.
+
+A failed render (missing matplotlib, unwritable output directory, ...) is reported and the worker
+keeps serving requests, so nothing ever waits on a dead worker. The worker also exits if the
+simulation process is killed.
+"""
+import multiprocessing
+import queue
+import traceback
+from visualization.downsampling import DEFAULT_MAX_POINTS
+
+PARENT_CHECK_INTERVAL = 1.0  # seconds the worker waits for a request before checking on its parent
+
+
+def run_plot_worker(requests, results_file, output_dir, max_points):
+    """
+    Body of the plot worker: render on every request until the final one (a True request).
+    """
+    from persistence.results_log import ResultsReader
+
+    parent = multiprocessing.parent_process()
+    reader = ResultsReader(results_file)
+    renderer = None
+    failed = False  # once the renderer cannot be created, stop trying and only drain the requests
+    try:
+        final = False
+        while not final:
+            try:
+                final = requests.get(timeout=PARENT_CHECK_INTERVAL)
+            except queue.Empty:
+                if parent is not None and not parent.is_alive():
+                    return
+                continue
+            if failed:
+                continue
+            try:
+                if renderer is None:
+                    from visualization.visualization import PlotRenderer
+                    renderer = PlotRenderer(output_dir, max_points)
+                reader.read_new()
+                renderer.render(reader.records)
+            except Exception:
+                failed = renderer is None
+                traceback.print_exc()
+                print(f"Plot rendering failed{', plots are disabled for this run' if failed else ''}")
+    finally:
+        if renderer is not None:
+            renderer.close()
+
+
+def request_plots(requests):
+    """
+    Ask the worker listening on `requests` for a render, without waiting.
+    """
+    try:
+        requests.put_nowait(False)
+    except queue.Full:
+        pass  # the pending request will render these results too
+
+
+class PlotWorker:
+    """
+    Plot worker process of one run. Give `requests` to `request_plots`, possibly from another process.
+    """
+    def __init__(self, results_file, output_dir, max_points=DEFAULT_MAX_POINTS):
+        self.requests = multiprocessing.Queue(1)
+        self.process = multiprocessing.Process(
+            target=run_plot_worker,
+            args=(self.requests, results_file, output_dir, max_points),
+            daemon=True
+        )
+        self.process.start()
+
+    def close(self):
+        """
+        Request the final render, once every result has been recorded, and wait for it.
+        """
+        while self.process.is_alive():
+            try:
+                self.requests.put(True, timeout=PARENT_CHECK_INTERVAL)
+                break
+            except queue.Full:
+                pass  # the worker is still rendering, or has died and will be seen as such
+        self.process.join()
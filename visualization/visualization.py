@@ -1,71 +1,106 @@
 import json
-import matplotlib.pyplot as plt
 import os
+from matplotlib.figure import Figure
+from persistence import results_log
+from visualization.downsampling import DEFAULT_MAX_POINTS, DownsampleCache
 
+METRIC_PLOTS = [
+    ("avg_error", "Average Error", "Avg Error vs. Processed Items"),
+    ("avg_error_percentage", "Average Error Percentage", "Avg Error Percentage vs. Processed Items"),
+    ("overestimation_percentage", "Overestimation Percentage (%)", "Overestimation Percentage vs. Processed Items"),
+    ("underestimation_percentage", "Underestimation Percentage (%)", "Underestimation Percentage vs. Processed Items"),
+    ("exact_match_percentage", "Exact Match Percentage (%)", "Exact Match Percentage vs. Processed Items"),
+    ("load_factor", "Load Factor", "Load Factor vs. Processed Items"),
+    ("avg_query_time", "Average Query Time (seconds per item)", "Average Query Time vs. Processed Items"),
+    ("memory_usage", "Memory Usage (bytes)", "Memory Usage vs. Processed Items"),
+    ("snapshot_time", "Snapshot Time (seconds)", "Snapshot Time vs. Processed Items"),
+]
 
-def load_results(filepath):
-    with open(filepath, "r") as file:
-        return json.load(file)
+PERCENTILE_CATEGORIES = ["overestimation", "underestimation", "combined"]
 
+# (percentile, marker, linestyle) of every line of a percentile plot
+PERCENTILE_STYLES = [("100th", "*", ":"), ("95th", "^", "-."), ("90th", "s", "-"), ("50th", "o", "--")]
 
-def plot_metric(results, metric, ylabel, title, save_path):
-    processed_items = [entry["processed_items"] for entry in results]
-    values = [entry[metric] for entry in results]
 
-    plt.figure(figsize=(8, 5))
-    plt.plot(processed_items, values, marker="o", linestyle="-", markersize=3, label=metric)
-    plt.xlabel("Number of Processed Items")
-    plt.ylabel(ylabel)
-    plt.title(title)
-    plt.legend()
-    plt.grid(True)
+def load_results(filepath):
+    """
+    Load a results log (.jsonl) or a legacy results.json.
+    """
+    if filepath.endswith(".jsonl"):
+        return results_log.load_results(filepath)
+    with open(filepath, "r") as file:
+        return json.load(file)
 
-    plt.savefig(save_path)
-    plt.close()
 
+class PlotRenderer:
+    """
+    Renders the PNG plots of one run into `output_dir`.
 
-def plot_percentile_category(results, category, save_path):
-    processed_items = [entry["processed_items"] for entry in results]
-    p50 = [entry["percentiles"][category].get("50th", 0.0) for entry in results]
-    p90 = [entry["percentiles"][category].get("90th", 0.0) for entry in results]
-    p95 = [entry["percentiles"][category].get("95th", 0.0) for entry in results]
-    p100 = [entry["percentiles"][category].get("100th", 0.0) for entry in results]
+    Every plot is created once; later renders only replace the data of its lines and save it again.
+    The figures are plain matplotlib Figures, not registered with pyplot, so they are freed with the
+    renderer (or by `close`). Series are downsampled to `max_points` points per line.
+    """
+    def __init__(self, output_dir, max_points=DEFAULT_MAX_POINTS):
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.max_points = max_points
+        self.downsampled = DownsampleCache()
+        self.figures = {}  # plot name -> (figure, axes, lines)
 
-    plt.figure(figsize=(8, 5))
-    plt.plot(processed_items, p100, marker="*", linestyle=":", markersize=3, label="100th Percentile")
-    plt.plot(processed_items, p95, marker="^", linestyle="-.", markersize=3, label="95th Percentile")
-    plt.plot(processed_items, p90, marker="s", linestyle="-", markersize=3, label="90th Percentile")
-    plt.plot(processed_items, p50, marker="o", linestyle="--", markersize=3, label="50th Percentile")
+    def _figure(self, name, ylabel, title, styles):
+        """
+        Return the figure of plot `name`, creating it with one line per (label, marker, linestyle).
+        """
+        if name not in self.figures:
+            figure = Figure(figsize=(8, 5))
+            axes = figure.add_subplot()
+            lines = [axes.plot([], [], marker=marker, linestyle=linestyle, markersize=3, label=label)[0]
+                     for label, marker, linestyle in styles]
+            axes.set_xlabel("Number of Processed Items")
+            axes.set_ylabel(ylabel)
+            axes.set_title(title)
+            axes.legend()
+            axes.grid(True)
+            self.figures[name] = (figure, axes, lines)
+        return self.figures[name]
 
-    plt.xlabel("Number of Processed Items")
-    plt.ylabel("Error Value")
-    plt.title(f"{category.capitalize()} Error Percentiles Over Time")
-    plt.legend()
-    plt.grid(True)
+    def _draw(self, name, ylabel, title, styles, processed_items, series):
+        figure, axes, lines = self._figure(name, ylabel, title, styles)
+        for line, (key, values) in zip(lines, series):
+            line.set_data(*self.downsampled.get(key, processed_items, values, self.max_points))
+        axes.relim()
+        axes.autoscale_view()
+        figure.savefig(os.path.join(self.output_dir, f"{name}.png"))
 
-    plt.savefig(save_path)
+    def render(self, results):
+        processed_items = [entry["processed_items"] for entry in results]
+        for metric, ylabel, title in METRIC_PLOTS:
+            # Metrics added later (e.g. snapshot_time) are missing from older results: plot the records having them
+            recorded = [entry for entry in results if entry.get(metric) is not None]
+            if recorded:
+                self._draw(metric, ylabel, title, [(metric, "o", "-")],
+                           [entry["processed_items"] for entry in recorded],
+                           [(metric, [entry[metric] for entry in recorded])])
+        for category in PERCENTILE_CATEGORIES:
+            styles = [(f"{percentile} Percentile", marker, linestyle)
+                      for percentile, marker, linestyle in PERCENTILE_STYLES]
+            series = [((category, percentile), [entry["percentiles"][category].get(percentile, 0.0) for entry in results])
+                      for percentile, _, _ in PERCENTILE_STYLES]
+            self._draw(f"{category}_percentiles", "Error Value", f"{category.capitalize()} Error Percentiles Over Time",
+                       styles, processed_items, series)
 
+    def close(self):
+        for figure, _, _ in self.figures.values():
+            figure.clear()
+        self.figures.clear()
 
-def visualize(results_file, output_dir):
-    os.makedirs(output_dir, exist_ok=True)
-    results = load_results(results_file)
 
-    plot_metric(results, "avg_error", "Average Error", "Avg Error vs. Processed Items", f"{output_dir}/avg_error.png")
-    plot_metric(results, "avg_error_percentage", "Average Error Percentage", "Avg Error Percentage vs. Processed Items", f"{output_dir}/avg_error_percentage.png")
-    plot_metric(results, "overestimation_percentage", "Overestimation Percentage (%)", "Overestimation Percentage vs. Processed Items",
-                f"{output_dir}/overestimation_percentage.png")
-    plot_metric(results, "underestimation_percentage", "Underestimation Percentage (%)",
-                "Underestimation Percentage vs. Processed Items",
-                f"{output_dir}/underestimation_percentage.png")
-    plot_metric(results, "exact_match_percentage", "Exact Match Percentage (%)",
-                "Exact Match Percentage vs. Processed Items",
-                f"{output_dir}/exact_match_percentage.png")
-    plot_metric(results, "load_factor", "Load Factor", "Load Factor vs. Processed Items",
-                f"{output_dir}/load_factor.png")
-    plot_metric(results, "avg_query_time", "Average Query Time (seconds per item)", "Average Query Time vs. Processed Items",
-                f"{output_dir}/avg_query_time.png")
-    plot_metric(results, "memory_usage", "Memory Usage (bytes)", "Memory Usage vs. Processed Items",
-                f"{output_dir}/memory_usage.png")
-    plot_percentile_category(results, "overestimation", f"{output_dir}/overestimation_percentiles.png")
-    plot_percentile_category(results, "underestimation", f"{output_dir}/underestimation_percentiles.png")
-    plot_percentile_category(results, "combined", f"{output_dir}/combined_percentiles.png")
+def visualize(results_file, output_dir, max_points=DEFAULT_MAX_POINTS):
+    """
+    Render the plots of a results file once.
+    """
+    renderer = PlotRenderer(output_dir, max_points)
+    try:
+        renderer.render(load_results(results_file))
+    finally:
+        renderer.close()